@@ -0,0 +1,50 @@
+"""add post search vector
+
+Revision ID: 4c1f9e2ab7d3
+Revises: 35007eadbfb3
+Create Date: 2026-10-17 10:12:04.183422
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1f9e2ab7d3'
+down_revision: Union[str, None] = '35007eadbfb3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Generated column keeps the document in sync with the post on every write,
+    # weighted so title/cuisine hits rank above ingredient/body hits.
+    op.add_column(
+        'posts',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(recipe_title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(cuisine_type, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(ingredients, '')), 'B') || "
+                "setweight(to_tsvector('english', coalesce(content, '')), 'C') || "
+                "setweight(to_tsvector('english', coalesce(instructions, '')), 'D')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix_posts_search_vector', 'posts', ['search_vector'], unique=False, postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_search_vector', table_name='posts', postgresql_using='gin')
+    op.drop_column('posts', 'search_vector')
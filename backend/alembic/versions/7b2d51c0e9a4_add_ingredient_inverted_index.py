@@ -0,0 +1,176 @@
+"""add ingredient inverted index
+
+Revision ID: 7b2d51c0e9a4
+Revises: 4c1f9e2ab7d3
+Create Date: 2026-10-17 11:02:37.551904
+
+"""
+import json
+import re
+from typing import Iterable, List, Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2d51c0e9a4'
+down_revision: Union[str, None] = '4c1f9e2ab7d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows per backfill statement
+BACKFILL_CHUNK = 5000
+
+# Frozen copy of api/post/ingredients.py's parser as of this revision. Migrations must
+# not import app code: later parser changes would silently change what this backfill
+# produces, and the app module may not even import against this schema.
+_MAX_INGREDIENT_LENGTH = 100
+
+# Words that describe quantity or preparation rather than the ingredient itself
+_UNITS = {
+    "cup", "cups", "c", "tbsp", "tablespoon", "tablespoons", "tsp", "teaspoon", "teaspoons",
+    "g", "gram", "grams", "kg", "kilogram", "kilograms", "mg", "ml", "l", "litre", "litres",
+    "liter", "liters", "oz", "ounce", "ounces", "lb", "lbs", "pound", "pounds", "pinch",
+    "dash", "clove", "cloves", "slice", "slices", "can", "cans", "pack", "packet", "packets",
+    "bunch", "handful", "piece", "pieces", "stick", "sticks", "sprig", "sprigs", "of",
+}
+_DESCRIPTORS = {
+    "fresh", "freshly", "chopped", "diced", "minced", "sliced", "grated", "ground", "large",
+    "small", "medium", "finely", "roughly", "thinly", "peeled", "crushed", "dried", "whole",
+    "boneless", "skinless", "optional", "to", "taste", "about", "and", "or", "a", "an",
+}
+
+_PARENTHESES = re.compile(r"\([^)]*\)")
+_QUANTITY = re.compile(r"[\d½¼¾⅓⅔⅛/.\-–]+")
+_NON_WORD = re.compile(r"[^a-z\s]")
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
+
+def _singularize(word: str) -> str:
+    """Cheap English singularization, good enough to fold 'tomatoes' into 'tomato'."""
+    if len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "shes", "ches", "xes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def _normalize_ingredient(item: str) -> Optional[str]:
+    """Reduce one ingredient line ('2 cups chopped Tomatoes, peeled') to a canonical name ('tomato')."""
+    text = _BULLET.sub("", item.lower())
+    text = _PARENTHESES.sub(" ", text)
+    text = text.split(",")[0]  # anything after the first comma is preparation notes
+    text = _QUANTITY.sub(" ", text)
+    text = _NON_WORD.sub(" ", text)
+
+    words = [w for w in text.split() if w not in _UNITS and w not in _DESCRIPTORS]
+    if not words:
+        return None
+
+    words[-1] = _singularize(words[-1])
+    name = " ".join(words)
+    return name[:_MAX_INGREDIENT_LENGTH]
+
+
+def _split_items(raw: str) -> List[str]:
+    # Post.ingredients may be a JSON list or free text
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, list):
+            return [str(item) for item in parsed]
+    except (ValueError, TypeError):
+        pass
+
+    lines = [line for line in re.split(r"[\n;]+", raw) if line.strip()]
+    if len(lines) == 1:
+        # single-line lists are usually comma separated
+        return lines[0].split(",")
+    return lines
+
+
+def _parse_ingredients(raw: Optional[str]) -> List[str]:
+    """Parse Post.ingredients into a de-duplicated list of normalized ingredient names."""
+    if not raw:
+        return []
+    return _normalize_pantry(_split_items(raw))
+
+
+def _normalize_pantry(items: Iterable[str]) -> List[str]:
+    """Normalize user-supplied ingredient names, keeping first-seen order."""
+    names = []
+    seen = set()
+    for item in items:
+        name = _normalize_ingredient(item)
+        if name and name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+
+def _chunks(items: list, size: int = BACKFILL_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ingredients',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('post_ingredients',
+    sa.Column('post_id', sa.UUID(), nullable=False),
+    sa.Column('ingredient_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ingredient_id'], ['ingredients.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id', 'ingredient_id')
+    )
+    op.create_index('ix_post_ingredients_ingredient_id_post_id', 'post_ingredients', ['ingredient_id', 'post_id'], unique=False)
+
+    # Backfill existing posts: parse everything first, then insert names and links in
+    # a few set-based statements instead of one round trip per ingredient
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, ingredients FROM posts WHERE ingredients IS NOT NULL")).all()
+    names = {}
+    post_ids, link_names = [], []
+    for post_id, raw in rows:
+        for name in _parse_ingredients(raw):
+            names.setdefault(name, None)
+            post_ids.append(str(post_id))
+            link_names.append(name)
+
+    for chunk in _chunks(list(names)):
+        bind.execute(
+            sa.text(
+                "INSERT INTO ingredients (name) "
+                "SELECT unnest(CAST(:names AS text[])) "
+                "ON CONFLICT (name) DO NOTHING"
+            ),
+            {"names": chunk},
+        )
+    for ids, chunk in zip(_chunks(post_ids), _chunks(link_names)):
+        bind.execute(
+            sa.text(
+                "INSERT INTO post_ingredients (post_id, ingredient_id) "
+                "SELECT l.post_id, i.id "
+                "FROM unnest(CAST(:post_ids AS uuid[]), CAST(:names AS text[])) AS l(post_id, name) "
+                "JOIN ingredients i ON i.name = l.name "
+                "ON CONFLICT DO NOTHING"
+            ),
+            {"post_ids": ids, "names": chunk},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_post_ingredients_ingredient_id_post_id', table_name='post_ingredients')
+    op.drop_table('post_ingredients')
+    op.drop_table('ingredients')
@@ -0,0 +1,52 @@
+"""add post counter deltas
+
+Revision ID: a3c9e5f7b218
+Revises: f8b2d6e4a195
+Create Date: 2026-10-17 16:05:41.218304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e5f7b218'
+down_revision: Union[str, None] = 'f8b2d6e4a195'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'post_counter_deltas',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('post_id', sa.UUID(), nullable=False),
+        sa.Column('likes_delta', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('comments_delta', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('saves_delta', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_post_counter_deltas_post_id'), 'post_counter_deltas', ['post_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # fold anything still pending so no engagement is lost
+    op.execute("""
+        UPDATE posts p
+        SET likes_count = GREATEST(0, p.likes_count + d.likes),
+            comments_count = GREATEST(0, p.comments_count + d.comments),
+            saves_count = GREATEST(0, p.saves_count + d.saves)
+        FROM (
+            SELECT post_id, sum(likes_delta) AS likes, sum(comments_delta) AS comments, sum(saves_delta) AS saves
+            FROM post_counter_deltas GROUP BY post_id
+        ) d
+        WHERE p.id = d.post_id
+    """)
+    op.drop_index(op.f('ix_post_counter_deltas_post_id'), table_name='post_counter_deltas')
+    op.drop_table('post_counter_deltas')
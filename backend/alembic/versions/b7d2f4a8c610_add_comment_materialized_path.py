@@ -0,0 +1,65 @@
+"""add comment materialized path
+
+Revision ID: b7d2f4a8c610
+Revises: a3c9e5f7b218
+Create Date: 2026-10-17 16:48:27.603915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f4a8c610'
+down_revision: Union[str, None] = 'a3c9e5f7b218'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same format as api.post.comment_tree.path_segment
+SEGMENT_SQL = (
+    "lpad(to_hex((extract(epoch FROM COALESCE({t}.created_at, now())) * 1000000)::bigint), 14, '0')"
+    " || substr(replace({t}.id::text, '-', ''), 1, 8)"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # top-level comments have no parent
+    op.alter_column('comments', 'parent_comment_id', existing_type=sa.UUID(), nullable=True)
+    op.add_column('comments', sa.Column('path', sa.Text(collation='C'), nullable=True))
+    op.add_column('comments', sa.Column('depth', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(f"""
+        WITH RECURSIVE tree AS (
+            SELECT c.id, {SEGMENT_SQL.format(t='c')} AS path, 0 AS depth
+            FROM comments c
+            WHERE c.parent_comment_id IS NULL OR c.parent_comment_id = c.id
+            UNION ALL
+            SELECT c.id, tree.path || '.' || {SEGMENT_SQL.format(t='c')}, tree.depth + 1
+            FROM comments c
+            JOIN tree ON c.parent_comment_id = tree.id
+            WHERE c.parent_comment_id <> c.id
+        )
+        UPDATE comments SET path = tree.path, depth = tree.depth
+        FROM tree
+        WHERE comments.id = tree.id
+    """)
+    # anything unreachable from a root (self-references, cycles, dangling parents) becomes top level
+    op.execute(f"""
+        UPDATE comments c
+        SET path = {SEGMENT_SQL.format(t='c')}, depth = 0, parent_comment_id = NULL
+        WHERE c.path IS NULL
+    """)
+
+    op.alter_column('comments', 'path', existing_type=sa.Text(collation='C'), nullable=False)
+    op.create_index('ix_comments_post_depth_path', 'comments', ['post_id', 'depth', 'path'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comments_post_depth_path', table_name='comments')
+    op.drop_column('comments', 'depth')
+    op.drop_column('comments', 'path')
+    # parent_comment_id stays nullable: top-level comments cannot satisfy NOT NULL
@@ -0,0 +1,46 @@
+"""add direct uploads
+
+Revision ID: c4e8a1d3f927
+Revises: b7d2f4a8c610
+Create Date: 2026-10-17 18:02:11.734590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1d3f927'
+down_revision: Union[str, None] = 'b7d2f4a8c610'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'direct_uploads',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('object_key', sa.String(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('upload_id', sa.String(), nullable=True),
+        sa.Column('status', sa.String(length=20), server_default='pending', nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('finalized_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('object_key')
+    )
+    op.create_index(
+        'ix_direct_uploads_expiring', 'direct_uploads', ['expires_at'],
+        unique=False, postgresql_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_direct_uploads_expiring', table_name='direct_uploads', postgresql_where=sa.text("status = 'pending'"))
+    op.drop_table('direct_uploads')
@@ -0,0 +1,33 @@
+"""add post feed keyset index
+
+Revision ID: c93e4a7f1d20
+Revises: 7b2d51c0e9a4
+Create Date: 2026-10-17 12:40:18.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c93e4a7f1d20'
+down_revision: Union[str, None] = '7b2d51c0e9a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_posts_feed_keyset',
+        'posts',
+        ['is_active', 'is_public', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_feed_keyset', table_name='posts')
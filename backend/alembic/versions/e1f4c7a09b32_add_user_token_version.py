@@ -0,0 +1,28 @@
+"""add user token version
+
+Revision ID: e1f4c7a09b32
+Revises: d5e8a3b61c07
+Create Date: 2026-10-17 14:05:31.582903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f4c7a09b32'
+down_revision: Union[str, None] = 'd5e8a3b61c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,53 @@
+"""add timeline fanout jobs
+
+Revision ID: e6a2c8f4b913
+Revises: c4e8a1d3f927
+Create Date: 2026-10-17 20:41:05.218336
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a2c8f4b913'
+down_revision: Union[str, None] = 'c4e8a1d3f927'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'timeline_fanout_jobs',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('post_id', sa.UUID(), nullable=False),
+        sa.Column('community_id', sa.UUID(), nullable=False),
+        sa.Column('author_id', sa.UUID(), nullable=False),
+        sa.Column('last_user_id', sa.UUID(), nullable=True),
+        sa.Column('status', sa.String(length=20), server_default='pending', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('post_id'),
+    )
+    op.create_index(
+        'ix_timeline_fanout_jobs_due',
+        'timeline_fanout_jobs',
+        ['next_attempt_at'],
+        unique=False,
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_timeline_fanout_jobs_due', table_name='timeline_fanout_jobs')
+    op.drop_table('timeline_fanout_jobs')
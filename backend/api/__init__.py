@@ -2,3 +2,5 @@ from .user import models
 from .post import models
 from .community import models
 from .stored_media import models
+from .timeline import models
+from .mail import models
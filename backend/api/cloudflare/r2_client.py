@@ -1,69 +1,177 @@
 import boto3
 import aiofiles
+import asyncio
 from botocore.config import Config
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from fastapi import UploadFile, HTTPException
 import os
 import uuid
 from uuid import UUID
-from typing import Tuple
-from datetime import datetime, timedelta
-from threading import Lock
-from collections import defaultdict
+from typing import Dict, List, Tuple, Optional
+import time
+from datetime import datetime, timezone
+
+from api.cloudflare.url_cache import PresignedUrlCache, RedisUrlStore
+from api.cloudflare.sigv4 import SigV4Presigner
+
+# bounded cache for pre-signed urls, optionally shared across workers through Redis
+R2_URL_CACHE_SIZE = int(os.getenv("R2_URL_CACHE_SIZE", "10000"))
+REDIS_URL = os.getenv("REDIS_URL")
+
+# sign GET urls with the local SigV4 signer instead of a botocore request per url
+R2_LOCAL_SIGNER = os.getenv("R2_LOCAL_SIGNER", "false").lower() == "true"
+
+# Align signing time to fixed windows so every worker hands out the identical URL
+# for a key during the window, letting browsers/CDNs cache media. 0 disables.
+R2_PRESIGN_BUCKET_SECONDS = int(os.getenv("R2_PRESIGN_BUCKET_SECONDS", "0"))
+MAX_PRESIGN_EXPIRES = 7 * 24 * 3600  # SigV4 limit
+
+# boto3 is blocking, so every network call runs on a dedicated pool sized to the
+# HTTP connection pool; the semaphore caps in-flight calls per worker.
+R2_MAX_CONCURRENCY = int(os.getenv("R2_MAX_CONCURRENCY", "16"))
+R2_CONNECT_TIMEOUT = int(os.getenv("R2_CONNECT_TIMEOUT", "5"))
+R2_READ_TIMEOUT = int(os.getenv("R2_READ_TIMEOUT", "60"))
+
+# Streaming multipart uploads for large files (R2 needs parts >= 5 MiB, except the last)
+R2_MULTIPART_THRESHOLD = int(os.getenv("R2_MULTIPART_THRESHOLD", str(16 * 1024 * 1024)))
+R2_MULTIPART_PART_SIZE = max(int(os.getenv("R2_MULTIPART_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+R2_MULTIPART_CONCURRENCY = int(os.getenv("R2_MULTIPART_CONCURRENCY", "4"))
+
+
+def _file_size(file: UploadFile) -> int:
+    """Size of an UploadFile without reading it into memory."""
+    if getattr(file, "size", None) is not None:
+        return file.size
+    position = file.file.tell()
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(position)
+    return size
 
-# in-memory cache for pre-signed url
-url_cache = {}
-locks = defaultdict(Lock)
 
 class CloudflareR2Client:
-    def __init__(self):
-        # R2 uses S3-compatible API
+    def __init__(
+        self,
+        endpoint_url: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        bucket_name: Optional[str] = None,
+        max_concurrency: int = R2_MAX_CONCURRENCY,
+    ):
+        # R2 uses S3-compatible API; endpoint can be overridden (R2_ENDPOINT_URL) to
+        # point at a local S3 stand-in such as MinIO or moto server
+        account_id = os.getenv('R2_ACCOUNT_ID')
+        self.endpoint_url = (
+            endpoint_url
+            or os.getenv('R2_ENDPOINT_URL')
+            or f"https://{account_id}.r2.cloudflarestorage.com"
+        )
+        access_key_id = access_key_id or os.getenv('R2_ACCESS_KEY_ID')
+        secret_access_key = secret_access_key or os.getenv('R2_SECRET_ACCESS_KEY')
         self.client = boto3.client(
             's3',
-            endpoint_url=f"https://{os.getenv('R2_ACCOUNT_ID')}.r2.cloudflarestorage.com",
-            aws_access_key_id=os.getenv('R2_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('R2_SECRET_ACCESS_KEY'),
+            endpoint_url=self.endpoint_url,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
             region_name='auto',
-            config=Config(signature_version='s3v4')
+            config=Config(
+                signature_version='s3v4',
+                max_pool_connections=max_concurrency,
+                connect_timeout=R2_CONNECT_TIMEOUT,
+                read_timeout=R2_READ_TIMEOUT,
+                retries={'max_attempts': 3, 'mode': 'standard'},
+            )
+        )
+        self.bucket_name = bucket_name or os.getenv('R2_BUCKET_NAME')
+        self.public_url = f"https://{self.bucket_name}.{account_id}.r2.dev"  # if public
+
+        self.signer = (
+            SigV4Presigner(access_key_id, secret_access_key, self.endpoint_url)
+            # bucketed signing needs control over the signing time, which boto3 doesn't expose
+            if R2_LOCAL_SIGNER or R2_PRESIGN_BUCKET_SECONDS > 0 else None
         )
-        self.bucket_name = os.getenv('R2_BUCKET_NAME')
-        self.public_url = f"https://{self.bucket_name}.{os.getenv('R2_ACCOUNT_ID')}.r2.dev"  # if public
-    
+        self.url_cache = PresignedUrlCache(
+            max_size=R2_URL_CACHE_SIZE,
+            store=RedisUrlStore(REDIS_URL) if REDIS_URL else None,
+        )
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="r2")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._max_concurrency = max_concurrency
+
+    async def _run(self, fn, *args, **kwargs):
+        """Run a blocking boto3 call on the R2 pool without blocking the event loop."""
+        return await self._run_tracked(None, fn, *args, **kwargs)
+
+    async def _run_tracked(self, in_flight: Optional[List[Future]], fn, *args, **kwargs):
+        """
+        Like _run, but appends the executor future to in_flight. Cancelling the
+        awaiting task does not stop a call that is already running on a thread;
+        the future lets callers wait for the call itself to finish.
+        """
+        if self._semaphore is None:
+            # created lazily so it binds to the running loop
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        async with self._semaphore:
+            future = self._executor.submit(partial(fn, *args, **kwargs))
+            if in_flight is not None:
+                in_flight.append(future)
+            return await asyncio.wrap_future(future)
+
+    def close(self):
+        """Release pooled threads (connections are closed with the boto3 client)."""
+        self._executor.shutdown(wait=False)
+
+    def build_object_key(self, filename: str, content_type: str, user_id: UUID) -> Tuple[str, str]:
+        """Return a unique object key for a user's file and its media type"""
+        # Get file extension
+        file_extension = filename.split('.')[-1]
+
+        # Determine folder and media type
+        if content_type.startswith('image/'):
+            subfolder = "images"
+            media_type = "image"
+        elif content_type.startswith('video/'):
+            subfolder = "video"
+            media_type = "video"
+        else:
+            subfolder = "files"
+            media_type = "file"
+
+        # Create unique object key
+        object_key = f"{user_id}/{subfolder}/{uuid.uuid4()}.{file_extension}"
+        return object_key, media_type
+
     async def upload_file(self, file: UploadFile, user_id: UUID) -> Tuple[str, str]:
         """
-        Upload file to R2 and return object key (to save in DB) and type
+        Upload file to R2 and return object key (to save in DB) and type.
+        Files above R2_MULTIPART_THRESHOLD are streamed as a multipart upload
+        instead of being read into memory.
         """
         try:
-            # Get file extension and type
-            file_extension = file.filename.split('.')[-1]
             content_type = file.content_type or 'application/octet-stream'
+            object_key, media_type = self.build_object_key(file.filename, content_type, user_id)
+            metadata = {
+                'user_id': str(user_id),
+                'original_filename': file.filename
+            }
 
-            # Determine folder and media type
-            if content_type.startswith('image/'):
-                subfolder = "images"
-                media_type = "image"
-            elif content_type.startswith('video/'):
-                subfolder = "video"
-                media_type = "video"
-            else:
-                subfolder = "files"
-                media_type = "file"
-
-            # Create unique object key
-            object_key = f"{user_id}/{subfolder}/{uuid.uuid4()}.{file_extension}"
+            if _file_size(file) >= R2_MULTIPART_THRESHOLD:
+                await self.upload_multipart(file, object_key, content_type, metadata)
+                return object_key, media_type
 
             # Read file content
             file_content = await file.read()
 
             # Upload to R2
-            self.client.put_object(
+            await self._run(
+                self.client.put_object,
                 Bucket=self.bucket_name,
                 Key=object_key,
                 Body=file_content,
                 ContentType=content_type,
-                Metadata={
-                    'user_id': str(user_id),
-                    'original_filename': file.filename
-                }
+                Metadata=metadata
             )
 
             # Return object key, not URL
@@ -72,34 +180,211 @@ class CloudflareR2Client:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
-    def get_presigned_url(self, object_key: str, expires_in: int = 3600) -> str:
-        """Generate presigned URL for private object with caching + lock"""
-        now = datetime.utcnow()
-
-        # quick check without lock (fast path)
-        if object_key in url_cache:
-            url, expiry_time = url_cache[object_key]
-            if expiry_time > now:
-                return url
-
-        # lock only when we need to regenerate
-        with locks[object_key]:
-            # check again inside lock (another thread may have already refreshed it)
-            if object_key in url_cache:
-                url, expiry_time = url_cache[object_key]
-                if expiry_time > now:
-                    return url
-
-            # generate new URL
+    async def upload_multipart(
+        self,
+        file: UploadFile,
+        object_key: str,
+        content_type: str,
+        metadata: dict,
+        part_size: int = R2_MULTIPART_PART_SIZE,
+        concurrency: int = R2_MULTIPART_CONCURRENCY,
+    ) -> None:
+        """
+        Stream an UploadFile into an S3 multipart upload.
+        At most `concurrency` parts are buffered at once, so memory per upload is
+        bounded by part_size * concurrency. Any failure (or cancellation) aborts
+        the multipart upload so no orphaned parts are billed.
+        """
+        await file.seek(0)
+        upload_id = await self.create_multipart_upload(object_key, content_type, metadata)
+
+        slots = asyncio.Semaphore(concurrency)
+        tasks = []
+        in_flight: List[Future] = []
+        try:
+            part_number = 1
+            while True:
+                # take a slot *before* reading so buffered chunks never exceed `concurrency`
+                await slots.acquire()
+                chunk = await file.read(part_size)
+                if not chunk:
+                    slots.release()
+                    break
+
+                tasks.append(asyncio.create_task(
+                    self._upload_part(object_key, upload_id, part_number, chunk, slots, in_flight)
+                ))
+                part_number += 1
+
+                # stop reading as soon as any part has failed
+                for task in tasks:
+                    if task.done() and not task.cancelled() and task.exception():
+                        raise task.exception()
+
+            parts = await asyncio.gather(*tasks)
+            await self.complete_multipart_upload(object_key, upload_id, parts)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # a part still uploading on a thread would be stored after the abort and
+            # billed with no upload to own it, so let running parts finish first
+            await self._drain(in_flight)
+            try:
+                await self.abort_multipart_upload(object_key, upload_id)
+            except Exception as e:
+                print(f"Failed to abort multipart upload {upload_id} for {object_key}: {e}")
+            raise
+
+    @staticmethod
+    async def _drain(in_flight: List[Future]) -> None:
+        """Drop executor calls that have not started and wait for the running ones"""
+        running = [future for future in in_flight if not future.cancel()]
+        if running:
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in running), return_exceptions=True)
+
+    async def _upload_part(
+        self,
+        object_key: str,
+        upload_id: str,
+        part_number: int,
+        chunk: bytes,
+        slots: asyncio.Semaphore,
+        in_flight: List[Future],
+    ) -> dict:
+        try:
+            response = await self._run_tracked(
+                in_flight,
+                self.client.upload_part,
+                Bucket=self.bucket_name,
+                Key=object_key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=chunk,
+            )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        finally:
+            slots.release()
+
+    def generate_presigned_upload_url(
+        self, object_key: str, content_type: str, size: int, metadata: dict, expires_in: int = 900
+    ) -> str:
+        """
+        Presigned PUT for a direct client upload. Content-Type, Content-Length and
+        metadata are part of the signature, so R2 rejects anything else.
+        """
+        return self.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket_name,
+                "Key": object_key,
+                "ContentType": content_type,
+                "ContentLength": size,
+                "Metadata": metadata,
+            },
+            ExpiresIn=expires_in,
+        )
+
+    def generate_presigned_part_url(
+        self, object_key: str, upload_id: str, part_number: int, expires_in: int = 900
+    ) -> str:
+        """Presigned URL for one part of a client-driven multipart upload"""
+        return self.client.generate_presigned_url(
+            "upload_part",
+            Params={
+                "Bucket": self.bucket_name,
+                "Key": object_key,
+                "UploadId": upload_id,
+                "PartNumber": part_number,
+            },
+            ExpiresIn=expires_in,
+        )
+
+    async def create_multipart_upload(self, object_key: str, content_type: str, metadata: dict) -> str:
+        """Start a multipart upload and return its upload ID"""
+        created = await self._run(
+            self.client.create_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=object_key,
+            ContentType=content_type,
+            Metadata=metadata,
+        )
+        return created["UploadId"]
+
+    async def complete_multipart_upload(self, object_key: str, upload_id: str, parts: list) -> None:
+        """Complete a multipart upload from [{"PartNumber": n, "ETag": etag}, ...]"""
+        await self._run(
+            self.client.complete_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=object_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])},
+        )
+
+    async def abort_multipart_upload(self, object_key: str, upload_id: str) -> None:
+        await self._run(
+            self.client.abort_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=object_key,
+            UploadId=upload_id,
+        )
+
+    async def head_object(self, object_key: str) -> Optional[dict]:
+        """Return object metadata, or None if the object does not exist"""
+        try:
+            return await self._run(self.client.head_object, Bucket=self.bucket_name, Key=object_key)
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def _sign_get(self, object_key: str, expires_in: int) -> Tuple[str, float]:
+        """Sign a GET url for object_key; returns (url, time the cached copy should be renewed)"""
+        if R2_PRESIGN_BUCKET_SECONDS > 0:
+            return self._sign_get_bucketed(object_key, expires_in, R2_PRESIGN_BUCKET_SECONDS)
+        if self.signer is not None:
+            url = self.signer.presign_get(self.bucket_name, object_key, expires_in)
+        else:
             url = self.client.generate_presigned_url(
                 "get_object",
                 Params={"Bucket": self.bucket_name, "Key": object_key},
                 ExpiresIn=expires_in,
             )
-            expiry_time = now + timedelta(seconds=expires_in - 60)  # renew a bit earlier
-            url_cache[object_key] = (url, expiry_time)
-            return url
-    
+        return url, time.time() + expires_in - 60  # renew a bit earlier
+
+    def _sign_get_bucketed(self, object_key: str, expires_in: int, bucket_seconds: int) -> Tuple[str, float]:
+        """
+        Deterministic signing: the signature time is the start of the current window,
+        so the URL only changes when the window rolls over. Expiry is stretched by
+        one window so a URL handed out at the end of a window still has expires_in left.
+        """
+        now = time.time()
+        window_start = int(now // bucket_seconds) * bucket_seconds
+        signed_expires = min(expires_in + bucket_seconds, MAX_PRESIGN_EXPIRES)
+        url = self.signer.presign_get(
+            self.bucket_name,
+            object_key,
+            signed_expires,
+            signed_at=datetime.fromtimestamp(window_start, tz=timezone.utc),
+        )
+        # renew exactly at the window boundary, in step with every other worker
+        return url, window_start + bucket_seconds
+
+    async def get_presigned_url(self, object_key: str, expires_in: int = 3600) -> str:
+        """
+        Generate presigned URL for private object, served from the bounded URL cache.
+        Signing itself is local HMAC work (no network I/O).
+        """
+        return await self.url_cache.get_or_create(
+            object_key, lambda: self._sign_get(object_key, expires_in)
+        )
+
+    async def get_presigned_urls(self, object_keys: List[str], expires_in: int = 3600) -> Dict[str, str]:
+        """Presign many keys at once (deduplicated, cache-aware); returns {object_key: url}"""
+        return await self.url_cache.get_many_or_create(
+            object_keys, lambda key: self._sign_get(key, expires_in)
+        )
+
     def is_bucket_public(self) -> bool:
         """Check if bucket is configured for public access"""
         # You'll need to implement this based on your bucket configuration
@@ -108,7 +393,7 @@ class CloudflareR2Client:
     async def delete_file(self, file_key: str) -> bool:
         """Delete file from R2"""
         try:
-            self.client.delete_object(Bucket=self.bucket_name, Key=file_key)
+            await self._run(self.client.delete_object, Bucket=self.bucket_name, Key=file_key)
             return True
         except:
             return False
@@ -1,40 +1,93 @@
-from api.cloudflare.r2_client import CloudflareR2Client
+from api.cloudflare.r2_client import CloudflareR2Client, R2_MULTIPART_PART_SIZE, R2_MULTIPART_THRESHOLD
 from fastapi import UploadFile, HTTPException
+from jose import JWTError, jwt
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
-from typing import Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import math
 import os
 
+from sqlalchemy import update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.user.auth import create_access_token, SECRET_KEY, ALGORITHM
+from api.stored_media.models import DirectUpload
+
 # Initialize R2 client
 r2_client = CloudflareR2Client()
 
+ALLOWED_MEDIA_TYPES = ['image/jpeg', 'image/png', 'image/gif', 'image/webp',
+                       'video/mp4', 'video/mpeg', 'video/quicktime']
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024  # 100MB per file (adjust as needed for your 10GB quota)
+
+# How long a client has to push bytes to a presigned upload URL
+DIRECT_UPLOAD_EXPIRES = int(os.getenv("R2_DIRECT_UPLOAD_EXPIRES", "900"))
+
+
+def _validate_media(content_type: Optional[str], size: int):
+    if content_type not in ALLOWED_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+    if size > MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail="File too large")
+
+
 async def upload_media_file(file: UploadFile, user_id: UUID) -> Tuple[str, str]:
     """
     Upload media file to R2 bucket
     Returns: (url, media_type)
     """
-    # Validate file type
-    allowed_types = ['image/jpeg', 'image/png', 'image/gif', 'image/webp', 
-                     'video/mp4', 'video/mpeg', 'video/quicktime']
-    
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail="Unsupported file type")
-    
-    # Check file size (adjust limit as needed for your 10GB quota)
-    max_size = 100 * 1024 * 1024  # 100MB per file
     file.file.seek(0, 2)  # Seek to end
     file_size = file.file.tell()
     file.file.seek(0)  # Reset to beginning
-    
-    if file_size > max_size:
-        raise HTTPException(status_code=413, detail="File too large")
-    
+
+    # Validate file type and size
+    _validate_media(file.content_type, file_size)
+
     return await r2_client.upload_file(file, user_id)
 
-def get_presigned_url(object_key: str, expires_in: int = 3600) -> str:
+async def get_presigned_url(object_key: str, expires_in: int = 3600) -> str:
     """
     Generate presigned URL for private object
     """
-    return r2_client.get_presigned_url(object_key, expires_in)
+    return await r2_client.get_presigned_url(object_key, expires_in)
+
+async def get_presigned_urls(object_keys: List[str], expires_in: int = 3600) -> Dict[str, str]:
+    """
+    Presign a batch of object keys in one call
+    Returns: {object_key: url}
+    """
+    return await r2_client.get_presigned_urls(object_keys, expires_in)
+
+async def presign_media_fields(items: Iterable, fields: Sequence[str] = ("image_url", "video_url")) -> None:
+    """
+    Replace object keys stored in `fields` of each item (object or dict) with presigned
+    URLs, in one batch. Pass response dicts rather than live ORM rows where the session
+    is used afterwards, or autoflush writes the URLs back to the table.
+    """
+    items = list(items)
+
+    def read(item, field):
+        return item.get(field) if isinstance(item, dict) else getattr(item, field)
+
+    def write(item, field, value):
+        if isinstance(item, dict):
+            item[field] = value
+        else:
+            setattr(item, field, value)
+
+    keys = [read(item, field) for item in items for field in fields if read(item, field)]
+    if not keys:
+        return
+    urls = await get_presigned_urls(keys)
+    for item in items:
+        for field in fields:
+            key = read(item, field)
+            if key:
+                write(item, field, urls[key])
+
+def get_url_cache_stats() -> dict:
+    """Hit/miss/eviction counters of the presigned URL cache"""
+    return r2_client.url_cache.stats()
 
 async def delete_media_file(file_key: str) -> bool:
     """Delete media file from R2 using the object key stored in DB"""
@@ -42,3 +95,149 @@ async def delete_media_file(file_key: str) -> bool:
         return await r2_client.delete_file(file_key)
     except:
         return False
+
+
+# ------------------- Direct-to-bucket uploads -------------------
+# Step 1: create_direct_upload hands the client presigned URL(s) plus a signed
+#         upload token describing exactly what it is allowed to upload.
+# Step 2: the client PUTs the bytes straight to R2 (and, for multipart uploads,
+#         calls complete_direct_upload with the part ETags).
+# Step 3: finalize_direct_upload verifies the object with HEAD and consumes the
+#         upload (each token can be finalized once) before the caller records it
+#         in Media / Post. Uploads never finalized are removed by the upload sweeper.
+
+def _decode_upload_token(upload_token: str, user_id: UUID) -> dict:
+    try:
+        payload = jwt.decode(upload_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid or expired upload token")
+
+    if payload.get("type") != "media_upload" or payload.get("sub") != str(user_id):
+        raise HTTPException(status_code=403, detail="Upload token does not belong to this user")
+    return payload
+
+
+def direct_upload_key(upload_token: str, user_id: UUID) -> str:
+    """Object key an upload token refers to (for idempotent finalize retries)"""
+    return _decode_upload_token(upload_token, user_id)["key"]
+
+
+async def create_direct_upload(db: AsyncSession, user_id: UUID, filename: str, content_type: str, size: int) -> dict:
+    """
+    Issue presigned upload URL(s) for a client upload that bypasses the API.
+    Large files get a multipart upload with one presigned URL per part.
+    Records the upload in the caller's transaction; the caller commits.
+    """
+    _validate_media(content_type, size)
+
+    object_key, media_type = r2_client.build_object_key(filename, content_type, user_id)
+    metadata = {"user_id": str(user_id), "original_filename": filename}
+
+    claims = {
+        "sub": str(user_id),
+        "type": "media_upload",
+        "key": object_key,
+        "media_type": media_type,
+        "content_type": content_type,
+        "size": size,
+    }
+    response = {
+        "object_key": object_key,
+        "media_type": media_type,
+        "expires_in": DIRECT_UPLOAD_EXPIRES,
+        "url": None,
+        "headers": {},
+        "upload_id": None,
+        "part_size": None,
+        "parts": [],
+    }
+
+    if size >= R2_MULTIPART_THRESHOLD:
+        upload_id = await r2_client.create_multipart_upload(object_key, content_type, metadata)
+        part_count = math.ceil(size / R2_MULTIPART_PART_SIZE)
+        claims["upload_id"] = upload_id
+        response.update(
+            upload_id=upload_id,
+            part_size=R2_MULTIPART_PART_SIZE,
+            parts=[
+                {
+                    "part_number": number,
+                    "url": r2_client.generate_presigned_part_url(
+                        object_key, upload_id, number, DIRECT_UPLOAD_EXPIRES
+                    ),
+                }
+                for number in range(1, part_count + 1)
+            ],
+        )
+    else:
+        response["url"] = r2_client.generate_presigned_upload_url(
+            object_key, content_type, size, metadata, DIRECT_UPLOAD_EXPIRES
+        )
+        # every signed header must be sent back verbatim by the client
+        response["headers"] = {
+            "Content-Type": content_type,
+            **{f"x-amz-meta-{name}": value for name, value in metadata.items()},
+        }
+
+    # token outlives the URLs a little so a slow upload can still be finalized
+    token_lifetime = timedelta(seconds=DIRECT_UPLOAD_EXPIRES * 2)
+    response["upload_token"] = create_access_token(data=claims, expires_delta=token_lifetime)
+    db.add(DirectUpload(
+        object_key=object_key,
+        user_id=user_id,
+        upload_id=claims.get("upload_id"),
+        expires_at=datetime.now(timezone.utc) + token_lifetime,
+    ))
+    return response
+
+
+async def complete_direct_upload(upload_token: str, user_id: UUID, parts: List[dict]) -> str:
+    """Complete a client-driven multipart upload; returns the object key"""
+    payload = _decode_upload_token(upload_token, user_id)
+    upload_id = payload.get("upload_id")
+    if not upload_id:
+        raise HTTPException(status_code=400, detail="Upload is not a multipart upload")
+    if not parts:
+        raise HTTPException(status_code=400, detail="No uploaded parts provided")
+
+    try:
+        await r2_client.complete_multipart_upload(payload["key"], upload_id, parts)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not complete upload: {str(e)}")
+    return payload["key"]
+
+
+async def finalize_direct_upload(db: AsyncSession, upload_token: str, user_id: UUID) -> Tuple[str, str]:
+    """
+    Verify a direct upload landed in the bucket as promised and consume it, so the
+    same object can never be attached twice. The claim is part of the caller's
+    transaction: it only sticks if the caller commits the row that uses the key.
+    Returns: (object_key, media_type), ready to be stored in the DB.
+    """
+    payload = _decode_upload_token(upload_token, user_id)
+    object_key = payload["key"]
+
+    head = await r2_client.head_object(object_key)
+    if head is None:
+        raise HTTPException(status_code=400, detail="Upload not found in bucket")
+
+    if head.get("ContentLength") != payload["size"] or head.get("ContentType") != payload["content_type"]:
+        # never keep bytes we didn't agree to store
+        await delete_media_file(object_key)
+        raise HTTPException(status_code=400, detail="Uploaded object does not match the declared file")
+
+    claimed = await db.execute(
+        update(DirectUpload)
+        .where(
+            DirectUpload.object_key == object_key,
+            DirectUpload.user_id == user_id,
+            DirectUpload.status == "pending",
+        )
+        .values(status="finalized", finalized_at=func.now())
+        .returning(DirectUpload.id)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.first() is None:
+        raise HTTPException(status_code=409, detail="Upload has already been used or has expired")
+
+    return object_key, payload["media_type"]
@@ -0,0 +1,94 @@
+import hashlib
+import hmac
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _quote(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+class SigV4Presigner:
+    """
+    Minimal AWS Signature V4 query-string presigner for S3/R2 GET URLs.
+
+    Produces the same URLs as boto3's generate_presigned_url("get_object")
+    (path-style, UNSIGNED-PAYLOAD, host as the only signed header) without
+    building a botocore request per call. The derived signing key is cached
+    per day, so each URL costs one SHA-256 and one HMAC.
+    """
+
+    def __init__(
+        self,
+        access_key_id: str,
+        secret_access_key: str,
+        endpoint_url: str,
+        region: str = "auto",
+        service: str = "s3",
+    ):
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.service = service
+
+        parts = urlsplit(endpoint_url)
+        self.scheme = parts.scheme or "https"
+        self.host = parts.netloc
+        self._signing_key: Optional[Tuple[str, bytes]] = None
+
+    def _key_for(self, datestamp: str) -> bytes:
+        if self._signing_key is None or self._signing_key[0] != datestamp:
+            k_date = _hmac(("AWS4" + self.secret_access_key).encode("utf-8"), datestamp)
+            k_region = _hmac(k_date, self.region)
+            k_service = _hmac(k_region, self.service)
+            self._signing_key = (datestamp, _hmac(k_service, "aws4_request"))
+        return self._signing_key[1]
+
+    def presign_get(
+        self, bucket: str, object_key: str, expires_in: int, signed_at: Optional[datetime] = None
+    ) -> str:
+        """Presigned GET URL for bucket/object_key valid for expires_in seconds from signed_at"""
+        path = "/" + _quote(bucket) + "/" + _quote(object_key, safe="-_.~/")
+        return self._presign("GET", path, expires_in, signed_at)
+
+    def _presign(self, method: str, canonical_uri: str, expires_in: int, signed_at: Optional[datetime]) -> str:
+        signed_at = (signed_at or datetime.now(timezone.utc)).astimezone(timezone.utc)
+        amz_date = signed_at.strftime("%Y%m%dT%H%M%SZ")
+        datestamp = signed_at.strftime("%Y%m%d")
+        scope = f"{datestamp}/{self.region}/{self.service}/aws4_request"
+        query: Dict[str, str] = {
+            "X-Amz-Algorithm": ALGORITHM,
+            "X-Amz-Credential": f"{self.access_key_id}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires_in),
+            "X-Amz-SignedHeaders": "host",
+        }
+        canonical_query = "&".join(
+            f"{_quote(name)}={_quote(value)}" for name, value in sorted(query.items())
+        )
+        canonical_request = "\n".join([
+            method,
+            canonical_uri,
+            canonical_query,
+            f"host:{self.host}\n",
+            "host",
+            "UNSIGNED-PAYLOAD",
+        ])
+        string_to_sign = "\n".join([
+            ALGORITHM,
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ])
+        signature = hmac.new(
+            self._key_for(datestamp), string_to_sign.encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+
+        return f"{self.scheme}://{self.host}{canonical_uri}?{canonical_query}&X-Amz-Signature={signature}"
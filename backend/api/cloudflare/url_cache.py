@@ -0,0 +1,248 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# (url, expires_at as a unix timestamp)
+CachedUrl = Tuple[str, float]
+
+
+class UrlStore(ABC):
+    """Shared backend for presigned URLs, so several workers hand out the same URL."""
+
+    @abstractmethod
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, CachedUrl]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, url: str, expires_at: float) -> None:
+        ...
+
+    async def get(self, key: str) -> Optional[CachedUrl]:
+        return (await self.get_many([key])).get(key)
+
+    async def set_many(self, entries: Dict[str, CachedUrl]) -> None:
+        for key, (url, expires_at) in entries.items():
+            await self.set(key, url, expires_at)
+
+
+class InMemoryUrlStore(UrlStore):
+    """Process-local stand-in for a shared store (tests / single worker)."""
+
+    def __init__(self):
+        self._data: Dict[str, CachedUrl] = {}
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, CachedUrl]:
+        now = time.time()
+        found = {}
+        for key in keys:
+            entry = self._data.get(key)
+            if entry and entry[1] > now:
+                found[key] = entry
+            elif entry:
+                del self._data[key]
+        return found
+
+    async def set(self, key: str, url: str, expires_at: float) -> None:
+        self._data[key] = (url, expires_at)
+
+
+class RedisUrlStore(UrlStore):
+    """Redis-compatible shared store; entries expire on their own via PX TTLs."""
+
+    def __init__(self, redis_url: str, prefix: str = "presigned:"):
+        import redis.asyncio as redis  # optional dependency, only needed when REDIS_URL is set
+
+        self._redis = redis.from_url(redis_url, decode_responses=True)
+        self._prefix = prefix
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, CachedUrl]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = await self._redis.mget([self._prefix + key for key in keys])
+        found = {}
+        for key, value in zip(keys, values):
+            if value:
+                expires_at, url = value.split("|", 1)
+                found[key] = (url, float(expires_at))
+        return found
+
+    async def set(self, key: str, url: str, expires_at: float) -> None:
+        await self.set_many({key: (url, expires_at)})
+
+    async def set_many(self, entries: Dict[str, CachedUrl]) -> None:
+        now = time.time()
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key, (url, expires_at) in entries.items():
+                ttl_ms = int((expires_at - now) * 1000)
+                if ttl_ms > 0:
+                    pipe.set(self._prefix + key, f"{expires_at}|{url}", px=ttl_ms)
+            await pipe.execute()
+
+
+class PresignedUrlCache:
+    """
+    Size-bounded LRU + TTL cache for presigned URLs, optionally layered over a
+    shared UrlStore. Concurrent misses for the same key share one signing call;
+    the in-flight marker is dropped as soon as it resolves, so nothing per-key
+    outlives the cache entry itself.
+    """
+
+    def __init__(self, max_size: int = 10000, store: Optional[UrlStore] = None):
+        self.max_size = max_size
+        self.store = store
+        self._entries: "OrderedDict[str, CachedUrl]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_local(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        url, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return url
+
+    def put_local(self, key: str, url: str, expires_at: float) -> None:
+        self._entries[key] = (url, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_create(self, key: str, factory: Callable[[], CachedUrl]) -> str:
+        """Return a cached URL for key, calling factory() -> (url, expires_at) on a miss"""
+        url = self.get_local(key)
+        if url is not None:
+            self.hits += 1
+            return url
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                url = await asyncio.shield(pending)
+                self.hits += 1
+                return url
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # we were cancelled ourselves
+            except Exception:
+                pass  # the leader failed; sign it ourselves below
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            url = await self._load(key, factory)
+            future.set_result(url)
+            return url
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # mark retrieved so an unawaited failure doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _load(self, key: str, factory: Callable[[], CachedUrl]) -> str:
+        if self.store is not None:
+            try:
+                shared = await self.store.get(key)
+            except Exception as e:
+                # shared store is an optimization; fall back to signing locally
+                print(f"Presigned URL store read failed: {e}")
+                shared = None
+            if shared is not None:
+                self.shared_hits += 1
+                self.put_local(key, *shared)
+                return shared[0]
+
+        self.misses += 1
+        url, expires_at = factory()
+        self.put_local(key, url, expires_at)
+        if self.store is not None:
+            try:
+                await self.store.set(key, url, expires_at)
+            except Exception as e:
+                print(f"Presigned URL store write failed: {e}")
+        return url
+
+    async def get_many_or_create(
+        self, keys: Iterable[str], factory: Callable[[str], CachedUrl]
+    ) -> Dict[str, str]:
+        """
+        Batch variant of get_or_create: local hits first, then one shared-store
+        round trip for the rest, then factory(key) for whatever is still missing.
+        """
+        urls: Dict[str, str] = {}
+        missing = []
+        for key in dict.fromkeys(keys):  # de-duplicate, keep order
+            url = self.get_local(key)
+            if url is None:
+                missing.append(key)
+            else:
+                self.hits += 1
+                urls[key] = url
+
+        if missing and self.store is not None:
+            try:
+                shared = await self.store.get_many(missing)
+            except Exception as e:
+                print(f"Presigned URL store read failed: {e}")
+                shared = {}
+            for key, (url, expires_at) in shared.items():
+                self.shared_hits += 1
+                self.put_local(key, url, expires_at)
+                urls[key] = url
+            missing = [key for key in missing if key not in shared]
+
+        created: Dict[str, CachedUrl] = {}
+        for key in missing:
+            self.misses += 1
+            url, expires_at = factory(key)
+            self.put_local(key, url, expires_at)
+            created[key] = (url, expires_at)
+            urls[key] = url
+
+        if created and self.store is not None:
+            try:
+                await self.store.set_many(created)
+            except Exception as e:
+                print(f"Presigned URL store write failed: {e}")
+        return urls
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry; returns how many were removed"""
+        now = time.time()
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "inflight": len(self._inflight),
+            "shared_store": type(self.store).__name__ if self.store else None,
+        }
@@ -7,13 +7,15 @@ from uuid import UUID
 import re
 from datetime import datetime
 
-from database.database import get_db
+from database.database import get_db, get_read_db
 from api.user.models import User
 from api.community.models import Community, CommunityInvite, community_members
 from api.community.schemas import *
-from api.user.auth import get_current_user
+from api.user.auth import get_current_principal
+from api.user.principal_cache import UserPrincipal
 from api.cloudflare.r2_service import upload_media_file
 from api.user.auth import require_verified_email
+from api.response_cache import response_cache, cache_key
 
 router = APIRouter(prefix="/communities", tags=["communities"])
 
@@ -24,7 +26,7 @@ def create_slug(name: str) -> str:
     return slug
 
 
-async def get_community_or_404(db: AsyncSession, community_id: UUID, current_user: User = None):
+async def get_community_or_404(db: AsyncSession, community_id: UUID, current_user: UserPrincipal = None):
     try:
         result = await db.execute(select(Community).where(Community.id == community_id))
         community = result.scalars().first()
@@ -59,7 +61,7 @@ async def create_community(
     display_photo: Optional[UploadFile] = File(None),
     banner_photo: Optional[UploadFile] = File(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_verified_email)
+    current_user: UserPrincipal = Depends(require_verified_email)
 ):
     try:
         community_data = CommunityCreate(
@@ -113,6 +115,7 @@ async def create_community(
             )
         )
         await db.commit()
+        await response_cache.invalidate("communities")
 
         result = await db.execute(
             select(Community).options(selectinload(Community.created_by)).where(Community.id == db_community.id)
@@ -133,34 +136,46 @@ async def get_communities(
     is_private: Optional[bool] = Query(None),
     sort_by: str = Query("created_at", regex="^(created_at|member_count|post_count|name)$"),
     sort_order: str = Query("desc", regex="^(asc|desc)$"),
-    db: AsyncSession = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Optional[UserPrincipal] = Depends(get_current_principal)
 ):
     try:
-        stmt = select(Community).options(selectinload(Community.created_by))
-        if category:
-            stmt = stmt.where(Community.category == category.lower())
-        if search:
-            stmt = stmt.where(or_(Community.name.ilike(f"%{search}%"), Community.description.ilike(f"%{search}%")))
-        if is_private is not None:
-            stmt = stmt.where(Community.is_private == is_private)
-
-        sort_column = getattr(Community, sort_by)
-        stmt = stmt.order_by(desc(sort_column) if sort_order == "desc" else sort_column)
-
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total = (await db.execute(count_stmt)).scalar()
-
-        offset = (page - 1) * size
-        stmt = stmt.offset(offset).limit(size)
-        communities = (await db.execute(stmt)).scalars().all()
-
-        return CommunityListResponse(
-            communities=communities,
-            total=total,
-            page=page,
-            size=size,
-            total_pages=(total + size - 1) // size
+        async def load_communities():
+            stmt = select(Community).options(selectinload(Community.created_by))
+            if category:
+                stmt = stmt.where(Community.category == category.lower())
+            if search:
+                stmt = stmt.where(or_(Community.name.ilike(f"%{search}%"), Community.description.ilike(f"%{search}%")))
+            if is_private is not None:
+                stmt = stmt.where(Community.is_private == is_private)
+
+            sort_column = getattr(Community, sort_by)
+            stmt = stmt.order_by(desc(sort_column) if sort_order == "desc" else sort_column)
+
+            count_stmt = select(func.count()).select_from(stmt.subquery())
+            total = (await db.execute(count_stmt)).scalar()
+
+            offset = (page - 1) * size
+            stmt = stmt.offset(offset).limit(size)
+            communities = (await db.execute(stmt)).scalars().all()
+
+            listing = CommunityListResponse(
+                communities=communities,
+                total=total,
+                page=page,
+                size=size,
+                total_pages=(total + size - 1) // size
+            )
+            return listing.model_dump(mode="json"), ()
+
+        # the listing is the same for every viewer
+        return await response_cache.get_or_compute(
+            cache_key(
+                "communities", page=page, size=size, category=category and category.lower(), search=search,
+                is_private=is_private, sort_by=sort_by, sort_order=sort_order,
+            ),
+            load_communities,
+            tags=["communities"],
         )
     except Exception as e:
         await db.rollback()
@@ -170,19 +185,26 @@ async def get_communities(
 @router.get("/{community_id}", response_model=CommunityDetailResponse)
 async def get_community(
     community_id: UUID,
-    db: AsyncSession = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Optional[UserPrincipal] = Depends(get_current_principal)
 ):
     try:
-        community = await get_community_or_404(db, community_id, current_user)
+        async def load_community():
+            result = await db.execute(
+                select(Community).options(
+                    selectinload(Community.created_by),
+                    selectinload(Community.members)
+                ).where(Community.id == community_id)
+            )
+            community = result.scalars().first()
+            if not community:
+                raise HTTPException(status_code=404, detail="Community not found")
+            return CommunityDetailResponse(**community.__dict__).model_dump(mode="json"), ()
 
-        result = await db.execute(
-            select(Community).options(
-                selectinload(Community.created_by),
-                selectinload(Community.members)
-            ).where(Community.id == community_id)
-        )
-        community = result.scalars().first()
+        # shared part is cached; membership (access check, is_member, user_role) is per viewer
+        community = dict(await response_cache.get_or_compute(
+            cache_key("community", community_id=community_id), load_community, tags=[f"community:{community_id}"]
+        ))
 
         is_member, user_role = False, None
         if current_user:
@@ -198,11 +220,15 @@ async def get_community(
             if membership:
                 is_member, user_role = True, membership.role
 
-        response_data = community.__dict__
-        response_data['is_member'] = is_member
-        response_data['user_role'] = user_role
-        return CommunityDetailResponse(**response_data)
+            if community["is_private"] and not is_member and community["created_by"]["id"] != str(current_user.id):
+                raise HTTPException(status_code=403, detail="Access denied to private community")
+
+        community['is_member'] = is_member
+        community['user_role'] = user_role
+        return community
 
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Community detail retrieval failed: {str(e)}")
@@ -213,7 +239,7 @@ async def join_community(
     community_id: UUID,
     request: JoinCommunityRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_principal)
 ):
     try:
         community = await get_community_or_404(db, community_id)
@@ -265,6 +291,7 @@ async def join_community(
 
         community.member_count += 1
         await db.commit()
+        await response_cache.invalidate(f"community:{community_id}", "communities")
 
         return MembershipResponse(
             community_id=community_id,
@@ -281,7 +308,7 @@ async def join_community(
 async def leave_community(
     community_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_principal)
 ):
     try:
         community = await get_community_or_404(db, community_id)
@@ -312,6 +339,7 @@ async def leave_community(
 
         community.member_count -= 1
         await db.commit()
+        await response_cache.invalidate(f"community:{community_id}", "communities")
 
         return {"message": "Successfully left community"}
     except Exception as e:
@@ -323,7 +351,7 @@ async def leave_community(
 async def delete_community(
     community_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_principal)
 ):
     try:
         community = await get_community_or_404(db, community_id)
@@ -333,6 +361,7 @@ async def delete_community(
 
         await db.delete(community)
         await db.commit()
+        await response_cache.invalidate(f"community:{community_id}", "communities")
 
         return {"message": "Community deleted successfully"}
     except Exception as e:
@@ -345,8 +374,8 @@ async def get_community_members(
     community_id: UUID,
     page: int = Query(1, ge=1),
     size: int = Query(50, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Optional[UserPrincipal] = Depends(get_current_principal)
 ):
     try:
         await get_community_or_404(db, community_id, current_user)
@@ -0,0 +1,67 @@
+import os
+from datetime import timedelta
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.mail.models import EmailJob
+from api.user.auth import create_access_token
+
+
+async def enqueue_email(
+    db: AsyncSession,
+    kind: str,
+    to_email: str,
+    subject: str,
+    body: str,
+    idempotency_key: str,
+    user_id: Optional[UUID] = None,
+) -> None:
+    """
+    Add an email to the outbox inside the caller's transaction (the caller commits).
+    A second job with the same idempotency_key is silently dropped.
+    """
+    await db.execute(
+        insert(EmailJob)
+        .values(
+            idempotency_key=idempotency_key,
+            kind=kind,
+            user_id=user_id,
+            to_email=to_email,
+            subject=subject,
+            body=body,
+        )
+        .on_conflict_do_nothing(index_elements=["idempotency_key"])
+    )
+
+
+async def enqueue_verification_email(db: AsyncSession, user, idempotency_key: str) -> None:
+    """Queue the 'verify your email' message for user (expires in 24 hours)"""
+    token = create_access_token(
+        data={"sub": str(user.id), "type": "email_verification"},
+        expires_delta=timedelta(hours=24)
+    )
+    verification_url = f"{os.getenv('FRONTEND_URL')}/verify-email?token={token}"
+
+    body = f"""
+    Hi {user.username},
+
+    Please verify your email address by clicking the link below:
+    {verification_url}
+
+    This link will expire in 24 hours.
+
+    Best regards,
+    CookNet Team
+    """
+    await enqueue_email(
+        db,
+        kind="email_verification",
+        to_email=user.email,
+        subject="Verify Your CookNet Email",
+        body=body,
+        idempotency_key=idempotency_key,
+        user_id=user.id,
+    )
@@ -0,0 +1,80 @@
+import os
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple
+
+from api.http_client import get_http_client
+
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "sendgrid").lower()  # sendgrid | memory
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
+
+class EmailMessage(NamedTuple):
+    to_email: str
+    subject: str
+    body: str
+    idempotency_key: str
+
+
+class EmailDeliveryError(Exception):
+    """Delivery failed; permanent errors are not retried"""
+
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class EmailTransport(ABC):
+    @abstractmethod
+    async def send(self, message: EmailMessage) -> None:
+        ...
+
+
+class SendGridTransport(EmailTransport):
+    """SendGrid v3 mail/send over the shared HTTP client"""
+
+    def __init__(self, api_key: str = None, sender: str = None, url: str = SENDGRID_SEND_URL):
+        self.api_key = api_key or os.getenv("SENDGRID_API_KEY")
+        self.sender = sender or os.getenv("SENDGRID_SENDER_EMAIL")
+        self.url = url
+
+    async def send(self, message: EmailMessage) -> None:
+        try:
+            response = await get_http_client().post(
+                self.url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json={
+                    "personalizations": [{"to": [{"email": message.to_email}]}],
+                    "from": {"email": self.sender},
+                    "subject": message.subject,
+                    "content": [{"type": "text/plain", "value": message.body}],
+                    # lets a duplicate delivery be traced back to its outbox row
+                    "custom_args": {"idempotency_key": message.idempotency_key},
+                },
+            )
+        except Exception as e:
+            raise EmailDeliveryError(f"SendGrid request failed: {e}")
+
+        if response.status_code == 202:
+            return
+        # 4xx other than rate limiting will fail the same way next time
+        permanent = 400 <= response.status_code < 500 and response.status_code != 429
+        raise EmailDeliveryError(f"SendGrid returned {response.status_code}: {response.text[:500]}", permanent)
+
+
+class MemoryTransport(EmailTransport):
+    """Collects messages in memory instead of sending them (local dev / tests)"""
+
+    def __init__(self):
+        self.sent: List[EmailMessage] = []
+
+    async def send(self, message: EmailMessage) -> None:
+        self.sent.append(message)
+        print(f"[memory email] to={message.to_email} subject={message.subject!r}")
+
+
+def build_transport(name: str = EMAIL_TRANSPORT) -> EmailTransport:
+    if name == "memory":
+        return MemoryTransport()
+    if name == "sendgrid":
+        return SendGridTransport()
+    raise ValueError(f"Unknown EMAIL_TRANSPORT: {name}")
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import random
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, or_, and_, func
+
+from api.mail.models import EmailJob
+from api.mail.transports import EmailTransport, EmailMessage, EmailDeliveryError, build_transport
+from api.http_client import HTTP_CONNECT_TIMEOUT, HTTP_POOL_TIMEOUT, HTTP_TIMEOUT
+from api.user.models import User
+from database.database import AsyncSessionLocal
+
+EMAIL_WORKER_ENABLED = os.getenv("EMAIL_WORKER_ENABLED", "true").lower() == "true"
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", "5"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+# Retry n waits about EMAIL_BACKOFF_BASE * 2^(n-1) seconds (with jitter), capped at EMAIL_BACKOFF_MAX
+EMAIL_BACKOFF_BASE = float(os.getenv("EMAIL_BACKOFF_BASE", "30"))
+EMAIL_BACKOFF_MAX = float(os.getenv("EMAIL_BACKOFF_MAX", "3600"))
+# Hard cap on one delivery attempt; httpx timeouts are per phase, so one request can
+# otherwise take connect + pool + read timeouts (or longer while a body trickles in)
+EMAIL_SEND_TIMEOUT = float(os.getenv(
+    "EMAIL_SEND_TIMEOUT", str(HTTP_CONNECT_TIMEOUT + HTTP_POOL_TIMEOUT + HTTP_TIMEOUT)
+))
+# Extra lease time for the claim and the per-message status updates
+EMAIL_LEASE_MARGIN = float(os.getenv("EMAIL_LEASE_MARGIN", "60"))
+# A job claimed by a worker that died is picked up again after this long. Never shorter
+# than a worst-case batch (batch_size * EMAIL_SEND_TIMEOUT + EMAIL_LEASE_MARGIN), or a
+# slow batch would be re-claimed by another worker and sent twice.
+EMAIL_LEASE_SECONDS = float(os.getenv("EMAIL_LEASE_SECONDS", "0"))
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(EMAIL_BACKOFF_MAX, EMAIL_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class EmailWorker:
+    """
+    Drains the email outbox in the background. Jobs are claimed in batches with
+    FOR UPDATE SKIP LOCKED plus a lease that outlasts the whole batch (every send
+    is capped at EMAIL_SEND_TIMEOUT), so several API processes can run a worker
+    side by side without sending anything twice.
+    """
+
+    def __init__(self, transport: Optional[EmailTransport] = None, batch_size: int = EMAIL_BATCH_SIZE):
+        self.transport = transport or build_transport()
+        self.batch_size = batch_size
+        self.lease_seconds = max(EMAIL_LEASE_SECONDS, batch_size * EMAIL_SEND_TIMEOUT + EMAIL_LEASE_MARGIN)
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout=10)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+            self._task = None
+
+    def notify(self) -> None:
+        """Poll right away instead of waiting for the next interval (call after commit)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                processed = await self.process_batch()
+            except Exception as e:
+                print(f"Email worker batch failed: {e}")
+                processed = 0
+            if processed >= self.batch_size:
+                continue  # more work is likely waiting
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=EMAIL_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _claim(self):
+        async with AsyncSessionLocal() as db:
+            due = (
+                select(EmailJob.id)
+                .where(
+                    or_(
+                        and_(EmailJob.status == "pending", EmailJob.next_attempt_at <= func.now()),
+                        and_(EmailJob.status == "sending", EmailJob.locked_until < func.now()),
+                    )
+                )
+                .order_by(EmailJob.next_attempt_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            result = await db.execute(
+                update(EmailJob)
+                .where(EmailJob.id.in_(due.scalar_subquery()))
+                .values(
+                    status="sending",
+                    attempts=EmailJob.attempts + 1,
+                    locked_until=func.now() + timedelta(seconds=self.lease_seconds),
+                )
+                .returning(
+                    EmailJob.id, EmailJob.kind, EmailJob.user_id, EmailJob.to_email,
+                    EmailJob.subject, EmailJob.body, EmailJob.idempotency_key, EmailJob.attempts,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            jobs = result.all()
+            await db.commit()
+            return jobs
+
+    async def process_batch(self) -> int:
+        """Claim and deliver one batch; returns how many jobs were attempted"""
+        jobs = await self._claim()
+        for job in jobs:
+            message = EmailMessage(job.to_email, job.subject, job.body, job.idempotency_key)
+            try:
+                await self._send(message)
+            except Exception as e:
+                permanent = isinstance(e, EmailDeliveryError) and e.permanent
+                await self._record_failure(job, str(e), permanent)
+            else:
+                await self._record_success(job)
+        return len(jobs)
+
+    async def _send(self, message: EmailMessage) -> None:
+        try:
+            await asyncio.wait_for(self.transport.send(message), timeout=EMAIL_SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise EmailDeliveryError(f"Send timed out after {EMAIL_SEND_TIMEOUT:g}s")
+
+    async def _record_success(self, job) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(EmailJob)
+                .where(EmailJob.id == job.id)
+                .values(status="sent", sent_at=func.now(), locked_until=None, last_error=None)
+            )
+            if job.kind == "email_verification" and job.user_id:
+                await db.execute(
+                    update(User).where(User.id == job.user_id).values(verification_email_sent=True)
+                )
+            await db.commit()
+        self.sent += 1
+
+    async def _record_failure(self, job, error: str, permanent: bool) -> None:
+        give_up = permanent or job.attempts >= EMAIL_MAX_ATTEMPTS
+        values = {"locked_until": None, "last_error": error[:2000]}
+        if give_up:
+            values["status"] = "failed"
+            self.failed += 1
+            print(f"Email {job.idempotency_key} failed permanently after {job.attempts} attempt(s): {error}")
+        else:
+            values["status"] = "pending"
+            values["next_attempt_at"] = func.now() + timedelta(seconds=retry_delay(job.attempts))
+            self.retried += 1
+            print(f"Email {job.idempotency_key} attempt {job.attempts} failed, will retry: {error}")
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(EmailJob).where(EmailJob.id == job.id).values(**values))
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "lease_seconds": self.lease_seconds,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+email_worker = EmailWorker()
@@ -0,0 +1,125 @@
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import select, true, null
+from sqlalchemy.orm import aliased, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.post.models import Comment
+from api.post.pagination import encode_cursor, decode_cursor
+
+# Replies nested deeper than this are rejected
+COMMENT_MAX_DEPTH = int(os.getenv("COMMENT_MAX_DEPTH", "16"))
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# (comment, first replies, more replies exist) for one entry of a page
+CommentSlice = Tuple[Comment, List[Comment], bool]
+
+
+def path_segment(created_at: datetime, comment_id: UUID) -> str:
+    """
+    Fixed-width path segment: creation time in microseconds (14 hex digits) then
+    the first 8 hex digits of the id, so siblings sort by time and never tie.
+    The backfill migration builds the same string in SQL.
+    """
+    micros = (created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros:014x}{comment_id.hex[:8]}"
+
+
+def new_comment_position(parent: Optional[Comment]) -> dict:
+    """id, created_at, path and depth for a comment being added under parent (None = top level)"""
+    comment_id = uuid.uuid4()
+    created_at = datetime.now(timezone.utc)
+    segment = path_segment(created_at, comment_id)
+    if parent is None:
+        return {"id": comment_id, "created_at": created_at, "path": segment, "depth": 0}
+    if parent.depth + 1 > COMMENT_MAX_DEPTH:
+        raise HTTPException(status_code=400, detail="Reply nesting is too deep")
+    return {"id": comment_id, "created_at": created_at, "path": f"{parent.path}.{segment}", "depth": parent.depth + 1}
+
+
+def encode_comment_cursor(comment: Comment) -> str:
+    return encode_cursor({"p": comment.path})
+
+
+def decode_comment_cursor(cursor: str) -> str:
+    path = decode_cursor(cursor).get("p")
+    if not isinstance(path, str) or not path:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return path
+
+
+def _children_of(post_id: UUID, parent_path, depth):
+    """
+    Filter for the active children of parent_path (None = top level). Descendants
+    of P are exactly the paths between "P." and "P/" ('/' follows '.' in byte
+    order), so this is a range scan on ix_comments_post_depth_path.
+    """
+    conditions = [Comment.post_id == post_id, Comment.depth == depth, Comment.is_active == True]
+    if parent_path is not None:
+        conditions += [Comment.path > parent_path + ".", Comment.path < parent_path + "/"]
+    return conditions
+
+
+async def load_comment_slice(
+    db: AsyncSession,
+    post_id: UUID,
+    parent: Optional[Comment],
+    cursor: Optional[str],
+    limit: int,
+    replies_limit: int,
+) -> Tuple[List[CommentSlice], bool, Optional[str]]:
+    """
+    One page of parent's children (top-level comments newest first, replies oldest
+    first), each with its first replies_limit replies, in a single query: the page
+    is a keyset range scan and the replies a LATERAL range scan per comment, so the
+    cost depends on the page size only, never on how big the thread is.
+    Returns (slices, has_more, next_cursor).
+    """
+    newest_first = parent is None
+    depth = 0 if parent is None else parent.depth + 1
+
+    page = select(Comment).where(*_children_of(post_id, parent.path if parent else None, depth))
+    if cursor:
+        after = decode_comment_cursor(cursor)
+        page = page.where(Comment.path < after if newest_first else Comment.path > after)
+    page = page.order_by(Comment.path.desc() if newest_first else Comment.path).limit(limit + 1).subquery("page")
+    Page = aliased(Comment, page)
+    page_order = Page.path.desc() if newest_first else Page.path
+
+    if replies_limit > 0:
+        first_replies = (
+            select(Comment)
+            .where(*_children_of(post_id, Page.path, Page.depth + 1))
+            .order_by(Comment.path)
+            .limit(replies_limit + 1)
+            .lateral("first_replies")
+        )
+        Reply = aliased(Comment, first_replies)
+        stmt = (
+            select(Page, Reply)
+            .outerjoin(first_replies, true())
+            .order_by(page_order, Reply.path)
+            .options(selectinload(Page.user), selectinload(Reply.user))
+        )
+    else:
+        stmt = select(Page, null()).order_by(page_order).options(selectinload(Page.user))
+
+    grouped: "OrderedDict[UUID, Tuple[Comment, List[Comment]]]" = OrderedDict()
+    for comment, reply in (await db.execute(stmt)).all():
+        entry = grouped.setdefault(comment.id, (comment, []))
+        if reply is not None:
+            entry[1].append(reply)
+
+    items = list(grouped.values())
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_comment_cursor(items[-1][0]) if has_more else None
+    slices = [(comment, replies[:replies_limit], len(replies) > replies_limit) for comment, replies in items]
+    return slices, has_more, next_cursor
@@ -0,0 +1,171 @@
+import asyncio
+import os
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import select, update, func
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from api.post.models import Post, PostCounterDelta
+from database.database import AsyncSessionLocal
+
+# direct: every like/comment/save updates the posts row
+# deferred: they append to post_counter_deltas and the flusher folds them in batches,
+#           so a viral post's row is written once per flush instead of once per like
+ENGAGEMENT_COUNTER_MODE = os.getenv("ENGAGEMENT_COUNTER_MODE", "direct").lower()
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "2"))
+COUNTER_FLUSH_BATCH = int(os.getenv("COUNTER_FLUSH_BATCH", "5000"))
+
+COUNTERS = ("likes", "comments", "saves")
+
+
+def deferred_counters() -> bool:
+    return ENGAGEMENT_COUNTER_MODE == "deferred"
+
+
+async def bump_counters(db: AsyncSession, post_id: UUID, likes: int = 0, comments: int = 0, saves: int = 0) -> None:
+    """Apply counter changes for a post in the caller's transaction (mode-aware, never read-modify-write)"""
+    deltas = {"likes": likes, "comments": comments, "saves": saves}
+    if not any(deltas.values()):
+        return
+    if deferred_counters():
+        db.add(PostCounterDelta(post_id=post_id, **{f"{name}_delta": n for name, n in deltas.items()}))
+        return
+    values = {
+        f"{name}_count": func.greatest(0, getattr(Post, f"{name}_count") + n)
+        for name, n in deltas.items() if n
+    }
+    await db.execute(
+        update(Post).where(Post.id == post_id).values(**values).execution_options(synchronize_session=False)
+    )
+
+
+async def apply_pending_counts(db: AsyncSession, posts: Iterable[Post]) -> None:
+    """
+    Deferred mode: add not-yet-flushed deltas to the loaded posts' counters (one query
+    per page). The values are set as committed state, so nothing is written back.
+    """
+    posts = list(posts)
+    if not deferred_counters() or not posts:
+        return
+    rows = await db.execute(
+        select(
+            PostCounterDelta.post_id,
+            func.sum(PostCounterDelta.likes_delta).label("likes"),
+            func.sum(PostCounterDelta.comments_delta).label("comments"),
+            func.sum(PostCounterDelta.saves_delta).label("saves"),
+        )
+        .where(PostCounterDelta.post_id.in_([p.id for p in posts]))
+        .group_by(PostCounterDelta.post_id)
+    )
+    pending = {row.post_id: row for row in rows}
+    for post in posts:
+        row = pending.get(post.id)
+        if row is None:
+            continue
+        for name in COUNTERS:
+            column = f"{name}_count"
+            set_committed_value(post, column, max(0, (getattr(post, column) or 0) + int(getattr(row, name) or 0)))
+
+
+# Claims a batch of deltas, sums them per post and applies them, all in one statement
+FLUSH_SQL = text("""
+    WITH batch AS (
+        DELETE FROM post_counter_deltas
+        WHERE id IN (
+            SELECT id FROM post_counter_deltas
+            ORDER BY id
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING post_id, likes_delta, comments_delta, saves_delta
+    ),
+    folded AS (
+        SELECT post_id,
+               sum(likes_delta) AS likes,
+               sum(comments_delta) AS comments,
+               sum(saves_delta) AS saves,
+               count(*) AS deltas
+        FROM batch
+        GROUP BY post_id
+    ),
+    applied AS (
+        UPDATE posts p
+        SET likes_count = GREATEST(0, p.likes_count + f.likes),
+            comments_count = GREATEST(0, p.comments_count + f.comments),
+            saves_count = GREATEST(0, p.saves_count + f.saves)
+        FROM folded f
+        WHERE p.id = f.post_id
+        RETURNING p.id
+    )
+    SELECT COALESCE(sum(deltas), 0) AS deltas, (SELECT count(*) FROM applied) AS posts FROM folded
+""")
+
+
+class CounterFlusher:
+    """Background task that folds post_counter_deltas into posts every COUNTER_FLUSH_INTERVAL"""
+
+    def __init__(self, interval: float = COUNTER_FLUSH_INTERVAL, batch_size: int = COUNTER_FLUSH_BATCH):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+        self.flushes = 0
+        self.deltas_folded = 0
+        self.posts_updated = 0
+
+    async def flush_once(self) -> int:
+        """Fold one batch; returns how many delta rows were consumed"""
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(FLUSH_SQL, {"batch_size": self.batch_size})).one()
+            await db.commit()
+        self.flushes += 1
+        self.deltas_folded += int(row.deltas)
+        self.posts_updated += int(row.posts)
+        return int(row.deltas)
+
+    async def flush_all(self) -> None:
+        while await self.flush_once() >= self.batch_size:
+            pass
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.flush_all()
+            except Exception as e:
+                print(f"Counter flush failed: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+            try:
+                # fold whatever is left so a clean shutdown leaves nothing pending
+                await self.flush_all()
+            except Exception as e:
+                print(f"Final counter flush failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "mode": ENGAGEMENT_COUNTER_MODE,
+            "running": self._task is not None and not self._task.done(),
+            "flushes": self.flushes,
+            "deltas_folded": self.deltas_folded,
+            "posts_updated": self.posts_updated,
+        }
+
+
+counter_flusher = CounterFlusher()
@@ -0,0 +1,107 @@
+from typing import Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.post.counters import deferred_counters
+
+# kind -> (table, unique constraint, counter column on posts, column in post_counter_deltas)
+ENGAGEMENT_KINDS = {
+    "like": ("likes", "unique_user_post_like", "likes_count", "likes_delta"),
+    "save": ("saves", "unique_user_post_save", "saves_count", "saves_delta"),
+}
+
+# One round trip: remove the row if it exists, otherwise insert it, and move the
+# post counter by exactly the number of rows that really changed. Concurrent
+# toggles serialize on the unique index and the posts row lock, so counts stay exact.
+TOGGLE_SQL = """
+    WITH target AS (
+        SELECT id FROM posts WHERE id = CAST(:post_id AS uuid) AND is_active = true
+    ),
+    removed AS (
+        DELETE FROM {table}
+        WHERE post_id = (SELECT id FROM target) AND user_id = CAST(:user_id AS uuid)
+        RETURNING 1
+    ),
+    added AS (
+        INSERT INTO {table} (id, user_id, post_id, created_at)
+        SELECT gen_random_uuid(), CAST(:user_id AS uuid), id, now()
+        FROM target
+        WHERE NOT EXISTS (SELECT 1 FROM removed)
+        ON CONFLICT ON CONSTRAINT {constraint} DO NOTHING
+        RETURNING 1
+    ),
+    counted AS (
+        UPDATE posts
+        SET {counter} = GREATEST(0, {counter} + (SELECT count(*) FROM added) - (SELECT count(*) FROM removed))
+        WHERE id = (SELECT id FROM target)
+        RETURNING {counter} AS total
+    )
+    SELECT EXISTS (SELECT 1 FROM target) AS found,
+           NOT EXISTS (SELECT 1 FROM removed) AS active,
+           (SELECT total FROM counted) AS total
+"""
+
+# Deferred counter mode: same toggle, but the change is appended to post_counter_deltas
+# instead of locking the posts row. The reported total is the base counter plus every
+# pending delta plus this one (the statement cannot see its own insert; Postgres runs
+# the `recorded` insert even though nothing selects from it).
+DEFERRED_TOGGLE_SQL = """
+    WITH target AS (
+        SELECT id, {counter} AS base FROM posts WHERE id = CAST(:post_id AS uuid) AND is_active = true
+    ),
+    removed AS (
+        DELETE FROM {table}
+        WHERE post_id = (SELECT id FROM target) AND user_id = CAST(:user_id AS uuid)
+        RETURNING 1
+    ),
+    added AS (
+        INSERT INTO {table} (id, user_id, post_id, created_at)
+        SELECT gen_random_uuid(), CAST(:user_id AS uuid), id, now()
+        FROM target
+        WHERE NOT EXISTS (SELECT 1 FROM removed)
+        ON CONFLICT ON CONSTRAINT {constraint} DO NOTHING
+        RETURNING 1
+    ),
+    change AS (
+        SELECT (SELECT count(*) FROM added) - (SELECT count(*) FROM removed) AS delta
+    ),
+    recorded AS (
+        INSERT INTO post_counter_deltas (post_id, {delta})
+        SELECT id, (SELECT delta FROM change) FROM target
+        WHERE (SELECT delta FROM change) <> 0
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM target) AS found,
+           NOT EXISTS (SELECT 1 FROM removed) AS active,
+           GREATEST(0, (SELECT base FROM target)
+               + COALESCE((SELECT sum({delta}) FROM post_counter_deltas
+                           WHERE post_id = (SELECT id FROM target)), 0)
+               + (SELECT delta FROM change)) AS total
+"""
+
+_TOGGLE_STATEMENTS = {
+    kind: text(TOGGLE_SQL.format(table=table, constraint=constraint, counter=counter))
+    for kind, (table, constraint, counter, _delta) in ENGAGEMENT_KINDS.items()
+}
+_DEFERRED_TOGGLE_STATEMENTS = {
+    kind: text(DEFERRED_TOGGLE_SQL.format(table=table, constraint=constraint, counter=counter, delta=delta))
+    for kind, (table, constraint, counter, delta) in ENGAGEMENT_KINDS.items()
+}
+
+
+async def toggle_engagement(db: AsyncSession, kind: str, post_id: UUID, user_id: UUID) -> Tuple[bool, int]:
+    """
+    Atomically toggle a like/save and return (active, new count).
+    A no-op insert that lost a race to a concurrent toggle still reports active,
+    since the row exists either way. Runs in the caller's transaction.
+    """
+    statements = _DEFERRED_TOGGLE_STATEMENTS if deferred_counters() else _TOGGLE_STATEMENTS
+    row = (await db.execute(
+        statements[kind], {"post_id": str(post_id), "user_id": str(user_id)}
+    )).one()
+    if not row.found:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return row.active, int(row.total or 0)
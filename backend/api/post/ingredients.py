@@ -0,0 +1,123 @@
+import json
+import re
+from typing import Iterable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select, delete, literal
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.post.models import Ingredient, PostIngredient
+
+MAX_INGREDIENT_LENGTH = 100
+
+# Words that describe quantity or preparation rather than the ingredient itself
+UNITS = {
+    "cup", "cups", "c", "tbsp", "tablespoon", "tablespoons", "tsp", "teaspoon", "teaspoons",
+    "g", "gram", "grams", "kg", "kilogram", "kilograms", "mg", "ml", "l", "litre", "litres",
+    "liter", "liters", "oz", "ounce", "ounces", "lb", "lbs", "pound", "pounds", "pinch",
+    "dash", "clove", "cloves", "slice", "slices", "can", "cans", "pack", "packet", "packets",
+    "bunch", "handful", "piece", "pieces", "stick", "sticks", "sprig", "sprigs", "of",
+}
+DESCRIPTORS = {
+    "fresh", "freshly", "chopped", "diced", "minced", "sliced", "grated", "ground", "large",
+    "small", "medium", "finely", "roughly", "thinly", "peeled", "crushed", "dried", "whole",
+    "boneless", "skinless", "optional", "to", "taste", "about", "and", "or", "a", "an",
+}
+
+_PARENTHESES = re.compile(r"\([^)]*\)")
+_QUANTITY = re.compile(r"[\d½¼¾⅓⅔⅛/.\-–]+")
+_NON_WORD = re.compile(r"[^a-z\s]")
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
+
+def _singularize(word: str) -> str:
+    """Cheap English singularization, good enough to fold 'tomatoes' into 'tomato'."""
+    if len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "shes", "ches", "xes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(item: str) -> Optional[str]:
+    """Reduce one ingredient line ('2 cups chopped Tomatoes, peeled') to a canonical name ('tomato')."""
+    text = _BULLET.sub("", item.lower())
+    text = _PARENTHESES.sub(" ", text)
+    text = text.split(",")[0]  # anything after the first comma is preparation notes
+    text = _QUANTITY.sub(" ", text)
+    text = _NON_WORD.sub(" ", text)
+
+    words = [w for w in text.split() if w not in UNITS and w not in DESCRIPTORS]
+    if not words:
+        return None
+
+    words[-1] = _singularize(words[-1])
+    name = " ".join(words)
+    return name[:MAX_INGREDIENT_LENGTH]
+
+
+def _split_items(raw: str) -> List[str]:
+    # Post.ingredients may be a JSON list or free text
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, list):
+            return [str(item) for item in parsed]
+    except (ValueError, TypeError):
+        pass
+
+    lines = [line for line in re.split(r"[\n;]+", raw) if line.strip()]
+    if len(lines) == 1:
+        # single-line lists are usually comma separated
+        return lines[0].split(",")
+    return lines
+
+
+def parse_ingredients(raw: Optional[str]) -> List[str]:
+    """Parse Post.ingredients into a de-duplicated list of normalized ingredient names."""
+    if not raw:
+        return []
+    return normalize_pantry(_split_items(raw))
+
+
+def normalize_pantry(items: Iterable[str]) -> List[str]:
+    """Normalize user-supplied ingredient names, keeping first-seen order."""
+    names = []
+    seen = set()
+    for item in items:
+        name = normalize_ingredient(item)
+        if name and name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+async def sync_post_ingredients(db: AsyncSession, post_id: UUID, raw: Optional[str]) -> List[str]:
+    """
+    Rebuild the post -> ingredient links for a post. Runs inside the caller's
+    transaction; the caller commits.
+    """
+    names = parse_ingredients(raw)
+
+    await db.execute(delete(PostIngredient).where(PostIngredient.post_id == post_id))
+    if not names:
+        return names
+
+    await db.execute(
+        pg_insert(Ingredient)
+        .values([{"name": name} for name in names])
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    await db.execute(
+        pg_insert(PostIngredient)
+        .from_select(
+            ["post_id", "ingredient_id"],
+            select(literal(post_id, PG_UUID(as_uuid=True)), Ingredient.id).where(Ingredient.name.in_(names)),
+        )
+        .on_conflict_do_nothing()
+    )
+    return names
@@ -0,0 +1,319 @@
+import asyncio
+import hashlib
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, union_all, literal, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.post.models import Like, Save
+from api.response_cache import response_cache
+from database.database import AsyncSessionLocal
+
+# Every like/save appends its post id to the user's interaction log in the response
+# cache store after commit; a worker brings its cached state up to date by applying
+# the entries it has not seen yet. Only a shared store (RESPONSE_CACHE_BACKEND=redis)
+# makes the log visible to every worker, so with the per-process store the cache
+# stays off unless the API runs as a single process (INTERACTION_CACHE_SINGLE_PROCESS=true).
+INTERACTION_CACHE_TTL_SECONDS = float(os.getenv("INTERACTION_CACHE_TTL_SECONDS", "300"))
+INTERACTION_CACHE_SIZE = int(os.getenv("INTERACTION_CACHE_SIZE", "10000"))
+INTERACTION_CACHE_SINGLE_PROCESS = os.getenv("INTERACTION_CACHE_SINGLE_PROCESS", "false").lower() == "true"
+# Exact per-post answers remembered per user
+INTERACTION_CHECKED_MAX = int(os.getenv("INTERACTION_CHECKED_MAX", "2000"))
+# Users with more likes + saves than this get no filter
+INTERACTION_FILTER_MAX_ITEMS = int(os.getenv("INTERACTION_FILTER_MAX_ITEMS", "5000"))
+INTERACTION_FILTER_CHUNK = int(os.getenv("INTERACTION_FILTER_CHUNK", "1000"))
+INTERACTION_FILTER_FP_RATE = float(os.getenv("INTERACTION_FILTER_FP_RATE", "0.01"))
+# Toggles kept per user log; a worker that fell further behind starts that user over
+INTERACTION_LOG_MAX = int(os.getenv("INTERACTION_LOG_MAX", "200"))
+# Outlives every cache entry, so an expired log can never hide toggles from a live entry
+INTERACTION_LOG_TTL_SECONDS = 2 * INTERACTION_CACHE_TTL_SECONDS + 60
+
+
+def interactions_log_key(user_id: UUID) -> str:
+    return f"interactions_log:{user_id}"
+
+
+def _log_entry(post_id: Optional[UUID]) -> str:
+    # unique per append, so a worker can find the last entry it applied
+    return f"{uuid.uuid4().hex[:12]}:{post_id or ''}"
+
+
+class PostIdBloom:
+    """Bloom filter over post ids: no false negatives, false positives only cost a query"""
+
+    def __init__(self, capacity: int, fp_rate: float = INTERACTION_FILTER_FP_RATE):
+        self.capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, post_id: UUID):
+        digest = hashlib.blake2b(post_id.bytes, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, post_id: UUID) -> None:
+        for pos in self._positions(post_id):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, post_id: UUID) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(post_id))
+
+
+class UserInteractions:
+    """
+    What this process knows about one user's likes/saves up to log entry log_tail:
+    exact answers learned from page queries, plus (once the background build
+    finishes) a Bloom filter of everything the user has liked or saved. Both
+    survive later toggles, which are applied from the log until the TTL runs out.
+    """
+
+    def __init__(self, expires_at: float):
+        self.log_tail: Optional[str] = None
+        self.expires_at = expires_at
+        self.checked: Dict[UUID, Tuple[bool, bool]] = {}
+        self.bloom: Optional[PostIdBloom] = None
+        self.too_many = False
+        self.building = False
+
+    def remember(self, post_ids: Iterable[UUID], liked: Set[UUID], saved: Set[UUID]) -> None:
+        for post_id in post_ids:
+            if len(self.checked) >= INTERACTION_CHECKED_MAX:
+                break
+            self.checked[post_id] = (post_id in liked, post_id in saved)
+
+    def apply(self, toggled: Iterable[UUID]) -> None:
+        """Toggled posts lose their exact answer; the filter only ever needs to grow"""
+        for post_id in toggled:
+            self.checked.pop(post_id, None)
+            if self.bloom is not None:
+                self.bloom.add(post_id)
+
+
+class InteractionCache:
+    """Size-bounded LRU + TTL cache of UserInteractions keyed by user id."""
+
+    def __init__(self, ttl_seconds: float = INTERACTION_CACHE_TTL_SECONDS, max_size: int = INTERACTION_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[UUID, UserInteractions]" = OrderedDict()
+        self._builds: Set[asyncio.Task] = set()
+
+        self.answered = 0
+        self.skipped_posts = 0
+        self.queried_posts = 0
+        self.builds = 0
+        self.resets = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and (response_cache.backend.shared or INTERACTION_CACHE_SINGLE_PROCESS)
+
+    def entry(self, user_id: UUID) -> UserInteractions:
+        """The user's entry, replacing one that has expired"""
+        entry = self._entries.get(user_id)
+        if entry is None or entry.expires_at <= time.monotonic():
+            return self.reset(user_id)
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def reset(self, user_id: UUID) -> UserInteractions:
+        entry = self._entries[user_id] = UserInteractions(time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def is_current(self, user_id: UUID, entry: UserInteractions) -> bool:
+        return self._entries.get(user_id) is entry
+
+    def schedule_build(self, user_id: UUID, entry: UserInteractions) -> None:
+        entry.building = True
+        task = asyncio.create_task(_build_filter(user_id, entry))
+        self._builds.add(task)
+        task.add_done_callback(self._builds.discard)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "answered_posts": self.answered,
+            "skipped_posts": self.skipped_posts,
+            "queried_posts": self.queried_posts,
+            "builds": self.builds,
+            "resets": self.resets,
+            "building": len(self._builds),
+        }
+
+
+interaction_cache = InteractionCache()
+
+
+async def record_interaction(user_id: UUID, post_id: UUID) -> None:
+    """Log a like/save toggle for every worker's cache; call after the write has committed"""
+    if not interaction_cache.enabled:
+        return
+    try:
+        await response_cache.backend.append(
+            interactions_log_key(user_id), _log_entry(post_id), INTERACTION_LOG_MAX, INTERACTION_LOG_TTL_SECONDS
+        )
+    except Exception as e:
+        print(f"Interaction log append failed: {e}")
+
+
+async def _log_tail(user_id: UUID) -> str:
+    """Newest entry of the user's log, starting the log with a no-op entry when there is none"""
+    key = interactions_log_key(user_id)
+    tail = await response_cache.backend.get_list(key, -1)
+    if tail:
+        return tail[0]
+    entry = _log_entry(None)
+    await response_cache.backend.append(key, entry, INTERACTION_LOG_MAX, INTERACTION_LOG_TTL_SECONDS)
+    return entry
+
+
+async def _synced_entry(user_id: UUID) -> UserInteractions:
+    """The user's entry with every logged toggle applied"""
+    entry = interaction_cache.entry(user_id)
+    tail = await _log_tail(user_id)
+    if entry.log_tail is None:
+        entry.log_tail = tail  # new entry: whatever it learns from here on postdates tail
+    elif entry.log_tail != tail:
+        log = await response_cache.backend.get_list(interactions_log_key(user_id))
+        try:
+            missed = log[log.index(entry.log_tail) + 1:]
+        except ValueError:
+            # the log no longer reaches back to this entry (trimmed or expired): start over
+            interaction_cache.resets += 1
+            entry = interaction_cache.reset(user_id)
+            entry.log_tail = tail
+        else:
+            entry.apply(UUID(post_id) for post_id in (item.split(":", 1)[1] for item in missed) if post_id)
+            entry.log_tail = missed[-1] if missed else tail
+    return entry
+
+
+def _interactions_stmt(user_id: UUID, post_ids: List[UUID]):
+    """Likes and saves of a user among post_ids as one UNION ALL of (post_id, kind)"""
+    likes = (
+        select(Like.post_id.label("post_id"), literal("like").label("kind"))
+        .where(Like.user_id == user_id, Like.post_id.in_(post_ids))
+    )
+    saves = (
+        select(Save.post_id.label("post_id"), literal("save").label("kind"))
+        .where(Save.user_id == user_id, Save.post_id.in_(post_ids))
+    )
+    return union_all(likes, saves)
+
+
+def _split(rows: Iterable) -> Tuple[Set[UUID], Set[UUID]]:
+    liked, saved = set(), set()
+    for post_id, kind in rows:
+        (liked if kind == "like" else saved).add(post_id)
+    return liked, saved
+
+
+async def _query(db: AsyncSession, user_id: UUID, post_ids: List[UUID]) -> Tuple[Set[UUID], Set[UUID]]:
+    return _split((await db.execute(_interactions_stmt(user_id, post_ids))).all())
+
+
+async def _build_filter(user_id: UUID, entry: UserInteractions) -> None:
+    """
+    Load the user's likes and saves in keyset chunks, off the request path and from
+    the primary, into a Bloom filter. The filter is installed with the log position
+    read before the scan, so toggles logged while it ran are applied on the next read.
+    """
+    try:
+        tail = await _log_tail(user_id)
+        async with AsyncSessionLocal() as db:
+            total = 0
+            for model in (Like, Save):
+                total += (await db.execute(
+                    select(func.count()).select_from(model).where(model.user_id == user_id)
+                )).scalar() or 0
+            if total > INTERACTION_FILTER_MAX_ITEMS:
+                entry.too_many = True
+                return
+
+            bloom = PostIdBloom(max(2 * total, 64))
+            for model in (Like, Save):
+                last: Optional[UUID] = None
+                while True:
+                    stmt = select(model.post_id).where(model.user_id == user_id)
+                    if last is not None:
+                        stmt = stmt.where(model.post_id > last)
+                    chunk = (await db.execute(
+                        stmt.order_by(model.post_id).limit(INTERACTION_FILTER_CHUNK)
+                    )).scalars().all()
+                    for post_id in chunk:
+                        bloom.add(post_id)
+                    if len(chunk) < INTERACTION_FILTER_CHUNK:
+                        break
+                    last = chunk[-1]
+
+        if interaction_cache.is_current(user_id, entry):
+            entry.bloom = bloom
+            entry.log_tail = tail
+            interaction_cache.builds += 1
+    except Exception as e:
+        print(f"Interaction filter build failed for user {user_id}: {e}")
+    finally:
+        entry.building = False
+
+
+async def load_interactions(db: AsyncSession, user_id: UUID, post_ids: List[UUID]) -> Tuple[Set[UUID], Set[UUID]]:
+    """
+    (liked, saved) post ids among post_ids, in at most one query.
+    Posts already answered since their last toggle, and posts the user's complete
+    filter rules out, need no query; only the rest go into one exact UNION ALL.
+    """
+    if not post_ids:
+        return set(), set()
+    if not interaction_cache.enabled:
+        return await _query(db, user_id, post_ids)
+
+    try:
+        entry = await _synced_entry(user_id)
+    except Exception as e:
+        print(f"Interaction log lookup failed: {e}")
+        return await _query(db, user_id, post_ids)
+
+    liked, saved, unknown = set(), set(), []
+    for post_id in post_ids:
+        state = entry.checked.get(post_id)
+        if state is not None:
+            interaction_cache.answered += 1
+            if state[0]:
+                liked.add(post_id)
+            if state[1]:
+                saved.add(post_id)
+        elif entry.bloom is not None and post_id not in entry.bloom:
+            interaction_cache.skipped_posts += 1
+        else:
+            unknown.append(post_id)
+
+    if unknown:
+        interaction_cache.queried_posts += len(unknown)
+        found_liked, found_saved = await _query(db, user_id, unknown)
+        liked |= found_liked
+        saved |= found_saved
+        # a lagging replica may not have this user's latest writes yet; don't cache those answers
+        if not db.info.get("use_replica"):
+            entry.remember(unknown, found_liked, found_saved)
+
+    if entry.bloom is None and not entry.building and not entry.too_many:
+        interaction_cache.schedule_build(user_id, entry)
+    return liked, saved
+
@@ -1,7 +1,7 @@
 import uuid
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, func, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Boolean, func, UniqueConstraint, Computed, Index
+from sqlalchemy.orm import relationship, deferred
 from database.database import Base
 
 class Post(Base):
@@ -22,6 +22,21 @@ class Post(Base):
     servings = Column(Integer, nullable=True)  # number of servings
     difficulty = Column(String(20), nullable=True)  # easy, medium, hard
     cuisine_type = Column(String(50), nullable=True)  # Italian, Mexican, etc.
+
+    # Full-text search document (generated by Postgres, never written by the app).
+    # Deferred so feed queries don't drag the tsvector over the wire.
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(recipe_title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(cuisine_type, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(ingredients, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'C') || "
+            "setweight(to_tsvector('english', coalesce(instructions, '')), 'D')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
     
     # Engagement metrics (for performance - avoid COUNT queries)
     likes_count = Column(Integer, default=0, nullable=False)
@@ -47,6 +62,20 @@ class Post(Base):
     community_id = Column(UUID(as_uuid=True), ForeignKey("communities.id"), nullable=True)
     community = relationship("Community", back_populates="posts")
 
+    __table_args__ = (
+        Index("ix_posts_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+# Feed keyset index: equality on the flags, then (created_at, id) DESC for row comparison
+Index(
+    "ix_posts_feed_keyset",
+    Post.is_active,
+    Post.is_public,
+    Post.created_at.desc(),
+    Post.id.desc(),
+)
+
 
 class Like(Base):
     __tablename__ = "likes"
@@ -73,7 +102,12 @@ class Comment(Base):
     post_id = Column(UUID(as_uuid=True), ForeignKey("posts.id"), nullable=False)
     
     # For nested comments (replies)
-    parent_comment_id = Column(UUID(as_uuid=True), ForeignKey("comments.id"), nullable=False)
+    parent_comment_id = Column(UUID(as_uuid=True), ForeignKey("comments.id"), nullable=True)
+
+    # Materialized path: one time-sortable segment per ancestor, dot separated
+    # (see api/post/comment_tree.py). "C" collation keeps byte order for range scans.
+    path = Column(Text(collation="C"), nullable=False)
+    depth = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -87,6 +121,10 @@ class Comment(Base):
     post = relationship("Post", back_populates="comments")
     parent = relationship("Comment", remote_side=[id], backref="replies")
 
+    __table_args__ = (
+        Index("ix_comments_post_depth_path", "post_id", "depth", "path"),
+    )
+
 
 class Save(Base):
     __tablename__ = "saves"
@@ -102,3 +140,34 @@ class Save(Base):
     
     # Ensure one save per user per post
     __table_args__ = (UniqueConstraint('user_id', 'post_id', name='unique_user_post_save'),)
+
+
+class Ingredient(Base):
+    __tablename__ = "ingredients"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(100), unique=True, nullable=False)  # normalized, e.g. "tomato"
+
+
+class PostIngredient(Base):
+    __tablename__ = "post_ingredients"
+
+    post_id = Column(UUID(as_uuid=True), ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id", ondelete="CASCADE"), primary_key=True)
+
+    # Inverted index: ingredient -> posts (the PK already covers post -> ingredients)
+    __table_args__ = (
+        Index("ix_post_ingredients_ingredient_id_post_id", "ingredient_id", "post_id"),
+    )
+
+
+class PostCounterDelta(Base):
+    """Pending engagement counter changes (deferred counter mode), folded into posts by the flusher"""
+    __tablename__ = "post_counter_deltas"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    post_id = Column(UUID(as_uuid=True), ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, index=True)
+    likes_delta = Column(Integer, nullable=False, default=0, server_default="0")
+    comments_delta = Column(Integer, nullable=False, default=0, server_default="0")
+    saves_delta = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,38 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Encode a keyset position into an opaque, URL-safe cursor string."""
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor, 400 on anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, dict):
+            raise ValueError("cursor payload must be an object")
+        return payload
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_post_cursor(created_at: datetime, post_id: UUID) -> str:
+    """Cursor for (created_at, id) keyset pagination over posts"""
+    return encode_cursor({"t": created_at.isoformat(), "id": str(post_id)})
+
+
+def decode_post_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    payload = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(payload["t"]), UUID(payload["id"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
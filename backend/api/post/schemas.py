@@ -79,7 +79,7 @@ class PostResponse(PostBase):
 class FeedResponse(BaseModel):
     posts: List[PostResponse]
     has_more: bool
-    next_cursor: Optional[UUID] = None
+    next_cursor: Optional[str] = None  # opaque (created_at, id) keyset cursor
     total_count: Optional[int] = None
 
 
@@ -89,6 +89,27 @@ class LikeResponse(BaseModel):
     likes_count: int
 
 
+# Bulk liked/saved lookup
+class InteractionsRequest(BaseModel):
+    post_ids: List[UUID]
+
+    @validator('post_ids')
+    def validate_post_ids(cls, v):
+        if len(v) > 100:
+            raise ValueError('Cannot look up more than 100 posts at once')
+        return v
+
+
+class PostInteraction(BaseModel):
+    post_id: UUID
+    is_liked: bool
+    is_saved: bool
+
+
+class InteractionsResponse(BaseModel):
+    interactions: List[PostInteraction]
+
+
 # Comment schemas
 class CommentBase(BaseModel):
     content: str
@@ -110,7 +131,10 @@ class CommentResponse(CommentBase):
     user: UserBasic
     created_at: datetime
     updated_at: Optional[datetime] = None
-    replies: List['CommentResponse'] = []  # For nested comments
+    depth: int = 0
+    replies: List['CommentResponse'] = []  # For nested comments (first few only)
+    has_more_replies: Optional[bool] = None  # None when replies were not loaded
+    replies_cursor: Optional[str] = None  # cursor for GET /{post_id}/comments/{comment_id}/replies
     
     class Config:
         from_attributes = True
@@ -122,7 +146,9 @@ CommentResponse.model_rebuild()
 
 class CommentsResponse(BaseModel):
     comments: List[CommentResponse]
-    total_count: int
+    has_more: bool = False
+    next_cursor: Optional[str] = None  # opaque keyset cursor
+    total_count: Optional[int] = None  # all comments on the post, replies included
 
 
 # Save response
@@ -3,13 +3,12 @@ from typing import Optional, List
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
-from sqlalchemy import select, desc, func
+from sqlalchemy import select, desc, tuple_, literal
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database import get_db
-from api.user.models import User
-from api.post.models import Post, Like, Comment, Save
+from database.database import get_db, get_read_db
+from api.post.models import Post, Comment
 from api.post.schemas import (
     PostResponse,
     PostUpdate,
@@ -19,13 +18,39 @@ from api.post.schemas import (
     CommentCreate,
     CommentResponse,
     CommentsResponse,
+    InteractionsRequest,
+    InteractionsResponse,
+    PostInteraction,
 )
-from api.user.auth import get_current_user
-from api.cloudflare.r2_service import upload_media_file, delete_media_file, get_presigned_url
+from api.stored_media.schemas import FinalizeUploadRequest
+from api.post.ingredients import sync_post_ingredients
+from api.post.pagination import encode_post_cursor, decode_post_cursor
+from api.post.engagement import toggle_engagement
+from api.post.counters import bump_counters, apply_pending_counts
+from api.post.interactions import load_interactions, record_interaction
+from api.post.comment_tree import load_comment_slice, new_comment_position, encode_comment_cursor
+from api.community.models import Community, community_members
+from api.timeline.service import fan_out_post
+from api.timeline.fanout import timeline_fanout_worker
+from api.user.auth import get_current_principal
+from api.user.principal_cache import UserPrincipal
+from api.cloudflare.r2_service import (
+    upload_media_file,
+    delete_media_file,
+    presign_media_fields,
+    finalize_direct_upload,
+    direct_upload_key,
+)
+from api.response_cache import response_cache, cache_key
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
 
+def post_cache_tags(post_id: UUID, author_id: UUID) -> List[str]:
+    """Cached responses that include a post: the post itself and its author's post pages"""
+    return [f"post:{post_id}", f"user_posts:{author_id}"]
+
+
 @router.post("/", response_model=PostResponse)
 async def create_post(
     content: Optional[str] = Form(None),
@@ -37,26 +62,46 @@ async def create_post(
     difficulty: Optional[str] = Form(None),
     cuisine_type: Optional[str] = Form(None),
     is_public: bool = Form(True),
+    community_id: Optional[UUID] = Form(None),
     image: Optional[UploadFile] = File(None),
     video: Optional[UploadFile] = File(None),
+    upload_token: Optional[str] = Form(None, description="Token of a finished direct upload (instead of image/video)"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
     """Create a new post with optional media upload"""
-    if not any([content, recipe_title, image, video]):
+    if not any([content, recipe_title, image, video, upload_token]):
         raise HTTPException(status_code=400, detail="Post must have at least content, recipe title, or media")
 
     if difficulty and difficulty.lower() not in ["easy", "medium", "hard"]:
         raise HTTPException(status_code=400, detail="Difficulty must be easy, medium, or hard")
 
-    if image and video:
+    if sum(bool(media) for media in (image, video, upload_token)) > 1:
         raise HTTPException(status_code=400, detail="Please upload either an image or video, not both")
 
+    community = None
+    if community_id:
+        result = await db.execute(
+            select(Community)
+            .join(community_members, community_members.c.community_id == Community.id)
+            .where(Community.id == community_id, community_members.c.user_id == current_user.id)
+        )
+        community = result.scalars().first()
+        if not community:
+            raise HTTPException(status_code=403, detail="You must be a member of the community to post in it")
+
     image_key: Optional[str] = None
     video_key: Optional[str] = None
 
-    # 1) Upload first
+    # 1) Upload first (or verify a direct upload that already landed in the bucket)
     try:
+        if upload_token:
+            object_key, media_type = await finalize_direct_upload(db, upload_token, current_user.id)
+            if media_type == "image":
+                image_key = object_key
+            elif media_type == "video":
+                video_key = object_key
+
         if image:
             object_key, media_type = await upload_media_file(image, current_user.id)
             if media_type == "image":
@@ -66,6 +111,8 @@ async def create_post(
             object_key, media_type = await upload_media_file(video, current_user.id)
             if media_type == "video":
                 video_key = object_key
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Media upload failed: {str(e)}")
 
@@ -84,12 +131,18 @@ async def create_post(
             image_url=image_key,   # storing object keys, not public URLs
             video_url=video_key,
             author_id=current_user.id,
+            community_id=community.id if community else None,
         )
 
         db.add(db_post)
+        if community:
+            community.post_count = (community.post_count or 0) + 1
+        await db.flush()
+        await sync_post_ingredients(db, db_post.id, ingredients)
+        # the author's timeline now, the members' through a fan-out job committed with the post
+        fan_out_queued = await fan_out_post(db, db_post, community.member_count if community else None)
         await db.commit()
         await db.refresh(db_post)
-        return db_post
 
     except Exception as e:
         await db.rollback()
@@ -103,6 +156,14 @@ async def create_post(
             pass
         raise HTTPException(status_code=500, detail=f"Post creation failed: {str(e)}")
 
+    if fan_out_queued:
+        timeline_fanout_worker.notify()
+    await response_cache.invalidate(
+        f"user_posts:{current_user.id}",
+        *([f"community:{community.id}", "communities"] if community else []),
+    )
+    return db_post
+
 
 @router.put("/{post_id}/media")
 async def update_post_media(
@@ -110,7 +171,7 @@ async def update_post_media(
     image: Optional[UploadFile] = File(None),
     video: Optional[UploadFile] = File(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
     """Update media for an existing post"""
 
@@ -151,6 +212,7 @@ async def update_post_media(
             post.image_url = None
 
         await db.commit()
+        await response_cache.invalidate(*post_cache_tags(post_id, current_user.id))
         return {
             "message": "Media updated successfully",
             "image_url": post.image_url,
@@ -163,11 +225,57 @@ async def update_post_media(
         raise HTTPException(status_code=500, detail=f"Media update failed: {str(e)}")
 
 
+@router.put("/{post_id}/media/finalize")
+async def finalize_post_media(
+    post_id: UUID,
+    request: FinalizeUploadRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    """Attach a finished direct upload to an existing post, replacing its media"""
+
+    # Load post
+    result = await db.execute(
+        select(Post).where(Post.id == post_id, Post.author_id == current_user.id)
+    )
+    post = result.scalars().first()
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found or unauthorized")
+
+    if direct_upload_key(request.upload_token, current_user.id) in (post.image_url, post.video_url):
+        # retried finalize, already attached
+        return {"message": "Media updated successfully", "image_url": post.image_url, "video_url": post.video_url}
+
+    object_key, media_type = await finalize_direct_upload(db, request.upload_token, current_user.id)
+    if media_type not in ("image", "video"):
+        raise HTTPException(status_code=400, detail="Post media must be an image or video")
+
+    old_media = [(kind, key) for kind, key in (("image", post.image_url), ("video", post.video_url)) if key]
+    try:
+        post.image_url = object_key if media_type == "image" else None
+        post.video_url = object_key if media_type == "video" else None
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        await delete_media_file(object_key)
+        raise HTTPException(status_code=500, detail=f"Media update failed: {str(e)}")
+    await response_cache.invalidate(*post_cache_tags(post_id, current_user.id))
+
+    # only drop the old media once the new key is safely recorded
+    old_media_deleted = [kind for kind, key in old_media if await delete_media_file(key)]
+    return {
+        "message": "Media updated successfully",
+        "image_url": post.image_url,
+        "video_url": post.video_url,
+        "old_media_deleted": old_media_deleted,
+    }
+
+
 @router.delete("/{post_id}")
 async def delete_post(
     post_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
     """Soft delete a post and async-delete its media"""
 
@@ -187,6 +295,7 @@ async def delete_post(
 
         post.is_active = False
         await db.commit()
+        await response_cache.invalidate(*post_cache_tags(post_id, current_user.id))
 
         # fire-and-forget
         if media_deletion_tasks:
@@ -201,29 +310,49 @@ async def delete_post(
         raise HTTPException(status_code=500, detail=f"Post deletion failed: {str(e)}")
 
 
+def _before_cursor(cursor: str):
+    """Row comparison selecting posts strictly after the cursor in (created_at, id) DESC order"""
+    created_at, post_id = decode_post_cursor(cursor)
+    return tuple_(Post.created_at, Post.id) < tuple_(
+        literal(created_at, Post.created_at.type), literal(post_id, Post.id.type)
+    )
+
+
 async def get_user_interactions(db: AsyncSession, user_id: UUID, post_ids: List[UUID]):
     """Get user's likes and saves for given posts"""
     try:
-        likes_result = await db.execute(
-            select(Like.post_id).where(Like.user_id == user_id, Like.post_id.in_(post_ids))
-        )
-        saves_result = await db.execute(
-            select(Save.post_id).where(Save.user_id == user_id, Save.post_id.in_(post_ids))
-        )
-
-        liked_posts = {row[0] for row in likes_result.all()}
-        saved_posts = {row[0] for row in saves_result.all()}
-        return liked_posts, saved_posts
+        return await load_interactions(db, user_id, post_ids)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"User interaction retrieval failed: {str(e)}")
 
 
+@router.post("/interactions", response_model=InteractionsResponse)
+async def get_interactions(
+    request: InteractionsRequest,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    """Refresh is_liked / is_saved for a list of posts"""
+    try:
+        post_ids = list(dict.fromkeys(request.post_ids))
+        liked_posts, saved_posts = await get_user_interactions(db, current_user.id, post_ids)
+        return InteractionsResponse(interactions=[
+            PostInteraction(post_id=pid, is_liked=pid in liked_posts, is_saved=pid in saved_posts)
+            for pid in post_ids
+        ])
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Interaction retrieval failed: {str(e)}")
+
+
 @router.get("/feed", response_model=FeedResponse)
 async def get_feed(
-    cursor: Optional[UUID] = Query(None, description="Last post ID for pagination"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
     limit: int = Query(10, ge=1, le=50, description="Number of posts to fetch"),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
     """Get paginated feed posts"""
     try:
@@ -231,14 +360,12 @@ async def get_feed(
             select(Post)
             .options(selectinload(Post.author))
             .where(Post.is_active == True, Post.is_public == True)
-            .order_by(desc(Post.created_at))
+            .order_by(desc(Post.created_at), desc(Post.id))
         )
 
+        # (created_at, id) keyset: no lookup query, and ties on created_at are not skipped
         if cursor:
-            cursor_res = await db.execute(select(Post).where(Post.id == cursor))
-            cursor_post = cursor_res.scalars().first()
-            if cursor_post:
-                base_stmt = base_stmt.where(Post.created_at < cursor_post.created_at)
+            base_stmt = base_stmt.where(_before_cursor(cursor))
 
         stmt = base_stmt.limit(limit + 1)
         res = await db.execute(stmt)
@@ -255,15 +382,15 @@ async def get_feed(
         for p in posts:
             p.is_liked = p.id in liked_posts
             p.is_saved = p.id in saved_posts
-            if p.image_url:
-                p.image_url = get_presigned_url(p.image_url)
-            if p.video_url:
-                p.video_url = get_presigned_url(p.video_url)
+        await apply_pending_counts(db, posts)
+        await presign_media_fields(posts)
 
-        next_cursor = posts[-1].id if posts else None
+        next_cursor = encode_post_cursor(posts[-1].created_at, posts[-1].id) if posts else None
 
         return FeedResponse(posts=posts, has_more=has_more, next_cursor=next_cursor)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Feed retrieval failed: {str(e)}")
 
@@ -271,34 +398,42 @@ async def get_feed(
 @router.get("/{post_id}", response_model=PostResponse)
 async def get_post(
     post_id: UUID,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
     """Get a specific post"""
     try:
-        res = await db.execute(
-            select(Post)
-            .options(selectinload(Post.author))
-            .where(Post.id == post_id, Post.is_active == True)
-        )
-        post = res.scalars().first()
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
-
-        if not post.is_public and post.author_id != current_user.id:
+        async def load_post():
+            res = await db.execute(
+                select(Post)
+                .options(selectinload(Post.author))
+                .where(Post.id == post_id, Post.is_active == True)
+            )
+            post = res.scalars().first()
+            if not post:
+                raise HTTPException(status_code=404, detail="Post not found")
+            await apply_pending_counts(db, [post])
+            # presign the dumped payload, not the ORM row, so nothing is left dirty
+            payload = PostResponse.model_validate(post).model_dump(mode="json")
+            await presign_media_fields([payload])
+            return payload, ()
+
+        # shared part is cached; access check and like/save flags are per viewer
+        post = dict(await response_cache.get_or_compute(
+            cache_key("post", post_id=post_id), load_post, tags=[f"post:{post_id}"]
+        ))
+
+        if not post["is_public"] and post["author"]["id"] != str(current_user.id):
             raise HTTPException(status_code=403, detail="Access denied")
 
         liked_posts, saved_posts = await get_user_interactions(db, current_user.id, [post_id])
-        post.is_liked = post_id in liked_posts
-        post.is_saved = post_id in saved_posts
-
-        if post.image_url:
-            post.image_url = get_presigned_url(post.image_url)
-        if post.video_url:
-            post.video_url = get_presigned_url(post.video_url)
+        post["is_liked"] = post_id in liked_posts
+        post["is_saved"] = post_id in saved_posts
 
         return post
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Post retrieval failed: {str(e)}")
 
@@ -308,7 +443,7 @@ async def update_post(
     post_id: UUID,
     post_update: PostUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
     """Update a post"""
     try:
@@ -323,9 +458,13 @@ async def update_post(
         for field, value in update_data.items():
             setattr(post, field, value)
 
+        if "ingredients" in update_data:
+            await sync_post_ingredients(db, post.id, post.ingredients)
+
         post.updated_at = datetime.utcnow()
         await db.commit()
         await db.refresh(post)
+        await response_cache.invalidate(*post_cache_tags(post_id, current_user.id))
         return post
 
     except Exception as e:
@@ -337,34 +476,19 @@ async def update_post(
 async def toggle_like(
     post_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
     """Toggle like on a post"""
     try:
-        # post exists?
-        res = await db.execute(select(Post).where(Post.id == post_id, Post.is_active == True))
-        post = res.scalars().first()
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
-
-        like_res = await db.execute(
-            select(Like).where(Like.post_id == post_id, Like.user_id == current_user.id)
-        )
-        existing_like = like_res.scalars().first()
-
-        if existing_like:
-            await db.delete(existing_like)
-            post.likes_count = max(0, post.likes_count - 1)
-            liked = False
-        else:
-            new_like = Like(post_id=post_id, user_id=current_user.id)
-            db.add(new_like)
-            post.likes_count += 1
-            liked = True
-
+        liked, likes_count = await toggle_engagement(db, "like", post_id, current_user.id)
         await db.commit()
-        return LikeResponse(liked=liked, likes_count=post.likes_count)
+        await record_interaction(current_user.id, post_id)
+        # counters only: cached post payloads are left to catch up within their TTL, since
+        # invalidating them on every like would keep popular posts out of the cache
+        return LikeResponse(liked=liked, likes_count=likes_count)
 
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Post liking failed: {str(e)}")
@@ -374,71 +498,90 @@ async def toggle_like(
 async def toggle_save(
     post_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
     """Toggle save on a post"""
     try:
-        res = await db.execute(select(Post).where(Post.id == post_id, Post.is_active == True))
-        post = res.scalars().first()
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
-
-        save_res = await db.execute(
-            select(Save).where(Save.post_id == post_id, Save.user_id == current_user.id)
-        )
-        existing_save = save_res.scalars().first()
-
-        if existing_save:
-            await db.delete(existing_save)
-            post.saves_count = max(0, post.saves_count - 1)
-            saved = False
-        else:
-            new_save = Save(post_id=post_id, user_id=current_user.id)
-            db.add(new_save)
-            post.saves_count += 1
-            saved = True
-
+        saved, saves_count = await toggle_engagement(db, "save", post_id, current_user.id)
         await db.commit()
-        return SaveResponse(saved=saved, saves_count=post.saves_count)
+        await record_interaction(current_user.id, post_id)
+        # counters only; cached post payloads catch up within their TTL (see toggle_like)
+        return SaveResponse(saved=saved, saves_count=saves_count)
 
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Post saving failed: {str(e)}")
 
 
+def _comment_response(comment: Comment, replies: Optional[List[Comment]] = None, more_replies: Optional[bool] = None) -> CommentResponse:
+    """Build the response explicitly so the lazy `replies` backref is never touched"""
+    return CommentResponse.model_validate({
+        "id": comment.id,
+        "content": comment.content,
+        "parent_comment_id": comment.parent_comment_id,
+        "user": comment.user,
+        "created_at": comment.created_at,
+        "updated_at": comment.updated_at,
+        "depth": comment.depth,
+        "replies": [_comment_response(r) for r in replies or []],
+        "has_more_replies": more_replies,
+        "replies_cursor": encode_comment_cursor(replies[-1]) if more_replies and replies else None,
+    }, from_attributes=True)
+
+
 @router.post("/{post_id}/comments", response_model=CommentResponse)
 async def add_comment(
     post_id: UUID,
     comment_data: CommentCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
-    """Add a comment to a post"""
+    """Add a comment (or a reply, with parent_comment_id) to a post"""
     try:
         res = await db.execute(select(Post).where(Post.id == post_id, Post.is_active == True))
         post = res.scalars().first()
         if not post:
             raise HTTPException(status_code=404, detail="Post not found")
 
+        parent = None
+        if comment_data.parent_comment_id is not None:
+            p_res = await db.execute(
+                select(Comment).where(
+                    Comment.id == comment_data.parent_comment_id,
+                    Comment.post_id == post_id,
+                    Comment.is_active == True,
+                )
+            )
+            parent = p_res.scalars().first()
+            if not parent:
+                raise HTTPException(status_code=404, detail="Parent comment not found")
+
         db_comment = Comment(
             **comment_data.model_dump(),
+            **new_comment_position(parent),
             post_id=post_id,
             user_id=current_user.id,
         )
         db.add(db_comment)
-        post.comments_count += 1
+        await bump_counters(db, post_id, comments=1)
         await db.commit()
-        await db.refresh(db_comment)
+        await response_cache.invalidate(f"post:{post_id}")
 
         # load with user relationship
         c_res = await db.execute(
             select(Comment)
             .options(selectinload(Comment.user))
             .where(Comment.id == db_comment.id)
+            .execution_options(populate_existing=True)
         )
         comment_with_user = c_res.scalars().first()
-        return comment_with_user
+        return _comment_response(comment_with_user, [], False)
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Comment addition failed: {str(e)}")
@@ -447,94 +590,128 @@ async def add_comment(
 @router.get("/{post_id}/comments", response_model=CommentsResponse)
 async def get_comments(
     post_id: UUID,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
     limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    replies: int = Query(3, ge=0, le=20, description="Replies to include under each comment"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
-    """Get comments for a post (top-level only)"""
+    """Get top-level comments for a post, newest first, each with its first replies"""
     try:
-        # ensure post exists (optional)
-        res = await db.execute(select(Post.id).where(Post.id == post_id, Post.is_active == True))
-        if not res.scalar():
+        res = await db.execute(select(Post).where(Post.id == post_id, Post.is_active == True))
+        post = res.scalars().first()
+        if not post:
             raise HTTPException(status_code=404, detail="Post not found")
+        await apply_pending_counts(db, [post])
 
-        comments_res = await db.execute(
-            select(Comment)
-            .options(selectinload(Comment.user), selectinload(Comment.replies))
-            .where(
-                Comment.post_id == post_id,
-                Comment.is_active == True,
-                Comment.parent_comment_id.is_(None),
-            )
-            .order_by(desc(Comment.created_at))
-            .offset(offset)
-            .limit(limit)
+        slices, has_more, next_cursor = await load_comment_slice(db, post_id, None, cursor, limit, replies)
+
+        return CommentsResponse(
+            comments=[_comment_response(c, r, more) for c, r, more in slices],
+            has_more=has_more,
+            next_cursor=next_cursor,
+            total_count=post.comments_count,
         )
-        comments = comments_res.scalars().all()
-
-        count_res = await db.execute(
-            select(func.count())
-            .select_from(Comment)
-            .where(
-                Comment.post_id == post_id,
-                Comment.is_active == True,
-                Comment.parent_comment_id.is_(None),
-            )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Comment retrieval failed: {str(e)}")
+
+
+@router.get("/{post_id}/comments/{comment_id}/replies", response_model=CommentsResponse)
+async def get_comment_replies(
+    post_id: UUID,
+    comment_id: UUID,
+    cursor: Optional[str] = Query(None, description="Opaque cursor (a comment's replies_cursor or a previous next_cursor)"),
+    limit: int = Query(20, ge=1, le=100),
+    replies: int = Query(3, ge=0, le=20, description="Replies to include under each reply"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    """Get direct replies to a comment, oldest first, each with its first replies"""
+    try:
+        res = await db.execute(
+            select(Comment).where(Comment.id == comment_id, Comment.post_id == post_id, Comment.is_active == True)
         )
-        total_count = count_res.scalar() or 0
+        parent = res.scalars().first()
+        if not parent:
+            raise HTTPException(status_code=404, detail="Comment not found")
 
-        return CommentsResponse(comments=comments, total_count=total_count)
+        slices, has_more, next_cursor = await load_comment_slice(db, post_id, parent, cursor, limit, replies)
+
+        return CommentsResponse(
+            comments=[_comment_response(c, r, more) for c, r, more in slices],
+            has_more=has_more,
+            next_cursor=next_cursor,
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Comment retrieval failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Reply retrieval failed: {str(e)}")
 
 
 @router.get("/users/{user_id}/posts", response_model=FeedResponse)
 async def get_user_posts(
     user_id: UUID,
-    cursor: Optional[UUID] = Query(None),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
     limit: int = Query(12, ge=1, le=50),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
     """Get posts by a specific user (public if not owner)"""
     try:
-        stmt = (
-            select(Post)
-            .options(selectinload(Post.author))
-            .where(Post.author_id == user_id, Post.is_active == True)
-        )
+        owner_view = user_id == current_user.id
 
-        if user_id != current_user.id:
-            stmt = stmt.where(Post.is_public == True)
+        async def load_page():
+            stmt = (
+                select(Post)
+                .options(selectinload(Post.author))
+                .where(Post.author_id == user_id, Post.is_active == True)
+            )
 
-        stmt = stmt.order_by(desc(Post.created_at))
+            if not owner_view:
+                stmt = stmt.where(Post.is_public == True)
 
-        if cursor:
-            cursor_res = await db.execute(select(Post).where(Post.id == cursor))
-            cursor_post = cursor_res.scalars().first()
-            if cursor_post:
-                stmt = stmt.where(Post.created_at < cursor_post.created_at)
+            stmt = stmt.order_by(desc(Post.created_at), desc(Post.id))
 
-        stmt = stmt.limit(limit + 1)
-        res = await db.execute(stmt)
-        posts = res.scalars().all()
+            if cursor:
+                stmt = stmt.where(_before_cursor(cursor))
 
-        has_more = len(posts) > limit
-        if has_more:
-            posts = posts[:limit]
+            stmt = stmt.limit(limit + 1)
+            res = await db.execute(stmt)
+            posts = res.scalars().all()
 
-        post_ids = [p.id for p in posts]
-        liked_posts, saved_posts = await get_user_interactions(db, current_user.id, post_ids)
+            has_more = len(posts) > limit
+            if has_more:
+                posts = posts[:limit]
 
-        for p in posts:
-            p.is_liked = p.id in liked_posts
-            p.is_saved = p.id in saved_posts
+            await apply_pending_counts(db, posts)
 
-        next_cursor = posts[-1].id if posts else None
+            next_cursor = encode_post_cursor(posts[-1].created_at, posts[-1].id) if posts else None
+            page = FeedResponse(posts=posts, has_more=has_more, next_cursor=next_cursor).model_dump(mode="json")
+            # presign the dumped payload, not the ORM rows, so nothing is left dirty
+            await presign_media_fields(page["posts"])
+            return page, [f"post:{p.id}" for p in posts]
 
-        return FeedResponse(posts=posts, has_more=has_more, next_cursor=next_cursor)
+        page = await response_cache.get_or_compute(
+            cache_key("user_posts", user_id=user_id, cursor=cursor, limit=limit, owner=owner_view),
+            load_page,
+            tags=[f"user_posts:{user_id}"],
+        )
+
+        posts = [dict(p) for p in page["posts"]]
+        post_ids = [UUID(p["id"]) for p in posts]
+        liked_posts, saved_posts = await get_user_interactions(db, current_user.id, post_ids)
+
+        for p, pid in zip(posts, post_ids):
+            p["is_liked"] = pid in liked_posts
+            p["is_saved"] = pid in saved_posts
+
+        return {**page, "posts": posts}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Post retrieval failed: {str(e)}")
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+
+# memory: per-process cache; redis: shared by every worker (uses REDIS_URL)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+# 0 disables response caching
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Tag versions must outlive every entry that recorded them
+TAG_TTL_SECONDS = max(RESPONSE_CACHE_TTL_SECONDS * 10, 3600)
+
+# compute() returns the shared, JSON-ready payload plus tags only known afterwards
+Computed = Tuple[Any, Iterable[str]]
+
+
+class CacheBackend(ABC):
+    """Key/value store for cached responses and tag versions."""
+
+    # True when every worker sees the same data (so tag versions are global)
+    shared = False
+
+    @abstractmethod
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        ...
+
+    @abstractmethod
+    async def set_many(self, entries: Dict[str, str], ttl_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    async def append(self, key: str, value: str, max_items: int, ttl_seconds: float) -> None:
+        """Atomically append to the list at key, keeping its last max_items values"""
+
+    @abstractmethod
+    async def get_list(self, key: str, start: int = 0) -> List[str]:
+        """Values of the list at key from index start on (negative counts from the end)"""
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await self.get_many([key])).get(key)
+
+    async def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        await self.set_many({key: value}, ttl_seconds)
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Size-bounded LRU + TTL store, local to this process."""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            entry = self._data.get(key)
+            if entry and entry[1] > now:
+                self._data.move_to_end(key)
+                found[key] = entry[0]
+            elif entry:
+                del self._data[key]
+        return found
+
+    async def set_many(self, entries: Dict[str, str], ttl_seconds: float) -> None:
+        expires_at = time.monotonic() + ttl_seconds
+        for key, value in entries.items():
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+        self._evict()
+
+    async def append(self, key: str, value: str, max_items: int, ttl_seconds: float) -> None:
+        items = self._list(key)
+        items.append(value)
+        self._data[key] = (json.dumps(items[-max_items:]), time.monotonic() + ttl_seconds)
+        self._data.move_to_end(key)
+        self._evict()
+
+    async def get_list(self, key: str, start: int = 0) -> List[str]:
+        return self._list(key)[start:]
+
+    def _list(self, key: str) -> List[str]:
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return []
+        self._data.move_to_end(key)
+        return json.loads(entry[0])
+
+    def _evict(self) -> None:
+        # evicting a tag version only turns its entries into misses, never into stale hits
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis-compatible shared store; entries expire on their own via PX TTLs."""
+
+    shared = True
+
+    def __init__(self, redis_url: str, prefix: str = "resp:"):
+        import redis.asyncio as redis  # optional dependency, only needed for RESPONSE_CACHE_BACKEND=redis
+
+        self._redis = redis.from_url(redis_url, decode_responses=True)
+        self._prefix = prefix
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = await self._redis.mget([self._prefix + key for key in keys])
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    async def set_many(self, entries: Dict[str, str], ttl_seconds: float) -> None:
+        ttl_ms = int(ttl_seconds * 1000)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key, value in entries.items():
+                pipe.set(self._prefix + key, value, px=ttl_ms)
+            await pipe.execute()
+
+    async def append(self, key: str, value: str, max_items: int, ttl_seconds: float) -> None:
+        name = self._prefix + key
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(name, value)
+            pipe.ltrim(name, -max_items, -1)
+            pipe.pexpire(name, int(ttl_seconds * 1000))
+            await pipe.execute()
+
+    async def get_list(self, key: str, start: int = 0) -> List[str]:
+        return await self._redis.lrange(self._prefix + key, start, -1)
+
+
+def cache_key(route: str, **params) -> str:
+    """route plus its parameters in a canonical order, None values dropped"""
+    normalized = sorted((name, str(value)) for name, value in params.items() if value is not None)
+    return f"{route}?{urlencode(normalized)}" if normalized else route
+
+
+def _tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+
+class ResponseCache:
+    """
+    Caches the shared part of GET responses (the same for every viewer) with TTLs
+    and tag-based invalidation. Each entry records the version of every tag it
+    depends on; invalidate() gives a tag a new version, which turns all of its
+    entries into misses at once. Concurrent misses for the same key in this
+    process share one computation.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Computed]],
+        tags: Iterable[str] = (),
+        ttl_seconds: Optional[float] = None,
+    ) -> Any:
+        """
+        Cached payload for key, or compute() -> (payload, extra tags) on a miss.
+        Versions of `tags` are read before computing, so a write that lands while
+        we compute still invalidates what we store.
+        """
+        if not self.enabled:
+            return (await compute())[0]
+
+        data = await self._lookup(key)
+        if data is not None:
+            self.hits += 1
+            return data
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                data = await asyncio.shield(pending)
+                self.hits += 1
+                return data
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # we were cancelled ourselves
+            except Exception:
+                pass  # the leader failed (e.g. 404); compute it ourselves below
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await self._load(key, compute, list(tags), ttl_seconds or self.ttl_seconds)
+            future.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # mark retrieved so an unawaited failure doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _lookup(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self.backend.get(key)
+            if raw is None:
+                return None
+            entry = json.loads(raw)
+            versions = entry["tags"]
+            if versions:
+                current = await self.backend.get_many(_tag_key(tag) for tag in versions)
+                if any(current.get(_tag_key(tag)) != version for tag, version in versions.items()):
+                    self.stale += 1
+                    return None
+            return entry["data"]
+        except Exception as e:
+            # the cache is an optimization; fall back to computing the response
+            self.errors += 1
+            print(f"Response cache read failed: {e}")
+            return None
+
+    async def tag_versions(self, tags: List[str]) -> Dict[str, str]:
+        """Current version of each tag, creating versions for tags that have none yet"""
+        if not tags:
+            return {}
+        found = await self.backend.get_many(_tag_key(tag) for tag in tags)
+        versions = {tag: found.get(_tag_key(tag)) for tag in tags}
+        created = {tag: uuid.uuid4().hex[:12] for tag, version in versions.items() if version is None}
+        if created:
+            await self.backend.set_many({_tag_key(tag): v for tag, v in created.items()}, TAG_TTL_SECONDS)
+            versions.update(created)
+        return versions
+
+    async def _load(self, key: str, compute, tags: List[str], ttl_seconds: float) -> Any:
+        self.misses += 1
+        try:
+            versions = await self.tag_versions(tags)
+        except Exception as e:
+            self.errors += 1
+            print(f"Response cache read failed: {e}")
+            return (await compute())[0]
+
+        data, extra_tags = await compute()
+        try:
+            extra = [tag for tag in dict.fromkeys(extra_tags) if tag not in versions]
+            versions.update(await self.tag_versions(extra))
+            await self.backend.set(key, json.dumps({"tags": versions, "data": data}), ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            print(f"Response cache write failed: {e}")
+        return data
+
+    async def invalidate(self, *tags: str) -> None:
+        """Give each tag a new version; call after the write has committed"""
+        if not tags:
+            return
+        try:
+            await self.backend.set_many(
+                {_tag_key(tag): uuid.uuid4().hex[:12] for tag in tags}, TAG_TTL_SECONDS
+            )
+        except Exception as e:
+            self.errors += 1
+            print(f"Response cache invalidation failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "errors": self.errors,
+            "inflight": len(self._inflight),
+        }
+
+
+def build_backend() -> CacheBackend:
+    if RESPONSE_CACHE_BACKEND == "redis":
+        if not REDIS_URL:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires REDIS_URL")
+        return RedisCacheBackend(REDIS_URL)
+    return InMemoryCacheBackend()
+
+
+response_cache = ResponseCache(build_backend())
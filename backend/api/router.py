@@ -7,6 +7,7 @@ from .user.views import router as user_router
 from .post.views import router as post_router
 from .community.views import router as community_router
 from .stored_media.views import router as stored_media_router
+from .timeline.views import router as timeline_router
 
 api_router = APIRouter()
 api_router.include_router(db_router)
@@ -15,4 +16,5 @@ api_router.include_router(user_router)
 api_router.include_router(post_router)
 api_router.include_router(community_router)
 api_router.include_router(stored_media_router)
+api_router.include_router(timeline_router)
 
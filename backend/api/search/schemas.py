@@ -0,0 +1,25 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+from api.post.schemas import PostResponse
+
+
+# Ranked recipe search results with keyset pagination
+class SearchResponse(BaseModel):
+    query: str
+    posts: List[PostResponse]
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+
+# A recipe together with how well it covers the supplied pantry
+class PantryMatch(PostResponse):
+    matched_ingredients: int
+    missing_ingredients: int
+
+
+class PantrySearchResponse(BaseModel):
+    ingredients: List[str]  # normalized pantry actually used for matching
+    posts: List[PantryMatch]
+    has_more: bool
+    next_cursor: Optional[str] = None
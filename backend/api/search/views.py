@@ -1,19 +1,184 @@
-from fastapi import APIRouter, HTTPException, Request
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, desc, func, tuple_, literal
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import get_read_db
+from api.post.models import Post, Ingredient, PostIngredient
+from api.post.ingredients import normalize_pantry
+from api.post.pagination import encode_cursor, decode_cursor
+from api.post.counters import apply_pending_counts
+from api.search.schemas import SearchResponse, PantrySearchResponse
+from api.cloudflare.r2_service import presign_media_fields
 
 router = APIRouter(prefix="/search", tags=["search"])
 
-@router.get("/search")
-async def search_recipes(request: Request, query: str):
+# ts_rank_cd normalization flag 32 scales rank into 0..1 (rank / (rank + 1))
+RANK_NORMALIZATION = 32
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_recipes(
+    query: str = Query(..., min_length=1, max_length=200, description="Free-text recipe query"),
+    difficulty: Optional[str] = Query(None, regex="^(easy|medium|hard)$"),
+    min_cooking_time: Optional[int] = Query(None, ge=1, description="Minimum cooking time in minutes"),
+    max_cooking_time: Optional[int] = Query(None, ge=1, description="Maximum cooking time in minutes"),
+    min_servings: Optional[int] = Query(None, ge=1),
+    max_servings: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
     Search for recipes based on a user query.
+    Matches against the GIN-indexed search_vector on posts and ranks by relevance.
     """
-    if not query:
+    if not query.strip():
         raise HTTPException(status_code=400, detail="Query parameter is required")
+
     try:
-        # This is a placeholder for your actual search function.
-        # Replace 'your_search_function(query)' with your implementation.
-        # For now, it just returns a dummy response.
-        results = {"query": query, "message": "Search functionality not yet implemented, returning dummy data."}
-        return results
+        ts_query = func.websearch_to_tsquery("english", query)
+        rank = func.ts_rank_cd(Post.search_vector, ts_query, RANK_NORMALIZATION)
+
+        stmt = (
+            select(Post, rank.label("rank"))
+            .options(selectinload(Post.author))
+            .where(
+                Post.search_vector.op("@@")(ts_query),
+                Post.is_active == True,
+                Post.is_public == True,
+            )
+        )
+
+        if difficulty:
+            stmt = stmt.where(Post.difficulty == difficulty)
+        if min_cooking_time is not None:
+            stmt = stmt.where(Post.cooking_time >= min_cooking_time)
+        if max_cooking_time is not None:
+            stmt = stmt.where(Post.cooking_time <= max_cooking_time)
+        if min_servings is not None:
+            stmt = stmt.where(Post.servings >= min_servings)
+        if max_servings is not None:
+            stmt = stmt.where(Post.servings <= max_servings)
+
+        # keyset on (rank, id) so deep pages cost the same as the first one
+        if cursor:
+            position = decode_cursor(cursor)
+            try:
+                cursor_rank = float(position["rank"])
+                cursor_id = UUID(position["id"])
+            except (KeyError, TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            stmt = stmt.where(tuple_(rank, Post.id) < tuple_(literal(cursor_rank), literal(cursor_id)))
+
+        stmt = stmt.order_by(desc(rank), desc(Post.id)).limit(limit + 1)
+        rows = (await db.execute(stmt)).all()
+
+        has_more = len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+
+        posts = [post for post, _ in rows]
+        await apply_pending_counts(db, posts)
+        await presign_media_fields(posts)
+
+        next_cursor = None
+        if has_more and rows:
+            last_post, last_rank = rows[-1]
+            next_cursor = encode_cursor({"rank": last_rank, "id": str(last_post.id)})
+
+        return SearchResponse(query=query, posts=posts, has_more=has_more, next_cursor=next_cursor)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+@router.get("/pantry", response_model=PantrySearchResponse)
+async def search_by_pantry(
+    ingredients: List[str] = Query(..., description="Ingredients on hand; repeat the param or comma-separate"),
+    max_missing: Optional[int] = Query(None, ge=0, description="Only recipes missing at most this many ingredients"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    "Cook with what I have": rank recipes by how many pantry ingredients they use,
+    then by how few ingredients are still missing. Matching runs entirely in
+    Postgres against the post_ingredients inverted index.
+    """
+    pantry = normalize_pantry(item for value in ingredients for item in value.split(","))
+    if not pantry:
+        raise HTTPException(status_code=400, detail="At least one ingredient is required")
+
+    try:
+        pantry_ids = select(Ingredient.id).where(Ingredient.name.in_(pantry))
+
+        matches = (
+            select(PostIngredient.post_id, func.count().label("matched"))
+            .where(PostIngredient.ingredient_id.in_(pantry_ids))
+            .group_by(PostIngredient.post_id)
+            .subquery()
+        )
+        totals = (
+            select(PostIngredient.post_id, func.count().label("total"))
+            .where(PostIngredient.post_id.in_(select(matches.c.post_id)))
+            .group_by(PostIngredient.post_id)
+            .subquery()
+        )
+        missing = totals.c.total - matches.c.matched
+
+        stmt = (
+            select(Post, matches.c.matched, missing.label("missing"))
+            .options(selectinload(Post.author))
+            .join(matches, matches.c.post_id == Post.id)
+            .join(totals, totals.c.post_id == Post.id)
+            .where(Post.is_active == True, Post.is_public == True)
+        )
+
+        if max_missing is not None:
+            stmt = stmt.where(missing <= max_missing)
+
+        # keyset on (matched desc, missing asc, id desc); negate missing so one tuple compare works
+        if cursor:
+            position = decode_cursor(cursor)
+            try:
+                cursor_key = (int(position["matched"]), -int(position["missing"]), UUID(position["id"]))
+            except (KeyError, TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            stmt = stmt.where(
+                tuple_(matches.c.matched, -missing, Post.id) < tuple_(*(literal(v) for v in cursor_key))
+            )
+
+        stmt = stmt.order_by(desc(matches.c.matched), missing, desc(Post.id)).limit(limit + 1)
+        rows = (await db.execute(stmt)).all()
+
+        has_more = len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+
+        posts = []
+        for post, matched, missing_count in rows:
+            post.matched_ingredients = matched
+            post.missing_ingredients = missing_count
+            posts.append(post)
+        await apply_pending_counts(db, posts)
+        await presign_media_fields(posts)
+
+        next_cursor = None
+        if has_more and rows:
+            last_post, last_matched, last_missing = rows[-1]
+            next_cursor = encode_cursor(
+                {"matched": last_matched, "missing": last_missing, "id": str(last_post.id)}
+            )
+
+        return PantrySearchResponse(ingredients=pantry, posts=posts, has_more=has_more, next_cursor=next_cursor)
+
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Pantry search failed: {str(e)}")
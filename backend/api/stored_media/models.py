@@ -1,6 +1,6 @@
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Column, String, DateTime, func, ForeignKey
+from sqlalchemy import Column, String, DateTime, func, ForeignKey, Index, text
 from database.database import Base
 
 class Media(Base):
@@ -11,3 +11,25 @@ class Media(Base):
     object_key = Column(String, nullable=False, unique=True)  # full R2 key
     media_type = Column(String(20), nullable=False)  # "image" or "video"
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class DirectUpload(Base):
+    """
+    One issued direct upload. Finalizing flips it from pending to finalized, so an
+    upload token (and its object key) can be attached only once; pending rows past
+    expires_at are cleaned out of the bucket by the upload sweeper.
+    """
+    __tablename__ = "direct_uploads"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    object_key = Column(String, nullable=False, unique=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    upload_id = Column(String, nullable=True)  # multipart upload id, if any
+    status = Column(String(20), nullable=False, default="pending", server_default="pending")  # pending|finalized|expired
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finalized_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_direct_uploads_expiring", "expires_at", postgresql_where=text("status = 'pending'")),
+    )
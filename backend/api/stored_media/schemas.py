@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -20,3 +21,43 @@ class MediaOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# Direct-to-bucket upload flow
+class DirectUploadRequest(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str
+    size: int = Field(..., gt=0)  # bytes, enforced by the presigned signature
+
+
+class UploadPartUrl(BaseModel):
+    part_number: int
+    url: str
+
+
+class DirectUploadResponse(BaseModel):
+    upload_token: str
+    object_key: str
+    media_type: str
+    expires_in: int
+    # single PUT upload
+    url: Optional[str] = None
+    headers: Dict[str, str] = {}
+    # multipart upload
+    upload_id: Optional[str] = None
+    part_size: Optional[int] = None
+    parts: List[UploadPartUrl] = []
+
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+
+class CompleteUploadRequest(BaseModel):
+    upload_token: str
+    parts: List[CompletedPart]
+
+
+class FinalizeUploadRequest(BaseModel):
+    upload_token: str
@@ -0,0 +1,85 @@
+import asyncio
+import os
+from typing import Optional
+
+from sqlalchemy import text
+
+from api.cloudflare.r2_service import r2_client, delete_media_file
+from database.database import AsyncSessionLocal
+
+UPLOAD_SWEEP_ENABLED = os.getenv("UPLOAD_SWEEP_ENABLED", "true").lower() == "true"
+UPLOAD_SWEEP_INTERVAL = float(os.getenv("UPLOAD_SWEEP_INTERVAL", "300"))
+UPLOAD_SWEEP_BATCH = int(os.getenv("UPLOAD_SWEEP_BATCH", "100"))
+
+# Claims a batch of expired, never-finalized uploads; SKIP LOCKED lets several workers sweep
+EXPIRE_SQL = text("""
+    UPDATE direct_uploads
+    SET status = 'expired'
+    WHERE id IN (
+        SELECT id FROM direct_uploads
+        WHERE status = 'pending' AND expires_at < now()
+        ORDER BY expires_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING object_key, upload_id
+""")
+
+
+class UploadSweeper:
+    """
+    Removes direct uploads that were never finalized: aborts their multipart upload
+    (dropping any stored parts) and deletes whatever object landed in the bucket.
+    Their upload tokens have expired by then, so nothing can finalize them later.
+    """
+
+    def __init__(self, interval: float = UPLOAD_SWEEP_INTERVAL, batch_size: int = UPLOAD_SWEEP_BATCH):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+        self.swept = 0
+
+    async def sweep_once(self) -> int:
+        """Expire one batch; returns how many uploads were cleaned up"""
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(EXPIRE_SQL, {"batch_size": self.batch_size})).all()
+            await db.commit()
+
+        for object_key, upload_id in rows:
+            if upload_id:
+                try:
+                    await r2_client.abort_multipart_upload(object_key, upload_id)
+                except Exception as e:
+                    # already completed or aborted; the object itself is deleted below
+                    print(f"Abort of expired multipart upload {upload_id} failed: {e}")
+            await delete_media_file(object_key)
+        self.swept += len(rows)
+        return len(rows)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                while await self.sweep_once() >= self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"Upload sweep failed: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+
+upload_sweeper = UploadSweeper()
@@ -5,20 +5,44 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from api.user.enum import RoleEnum
-from api.user.models import User
-from api.user.auth import get_current_user
-from api.cloudflare.r2_service import upload_media_file, get_presigned_url, delete_media_file
+from api.user.auth import get_current_principal, get_token_principal
+from api.user.principal_cache import UserPrincipal
+from api.cloudflare.r2_service import (
+    upload_media_file,
+    get_presigned_url,
+    delete_media_file,
+    create_direct_upload,
+    complete_direct_upload,
+    finalize_direct_upload,
+    direct_upload_key,
+    get_url_cache_stats,
+)
 from api.stored_media.models import Media
-from api.stored_media.schemas import MediaResponse, MediaOut
-from database.database import get_db
+from api.stored_media.schemas import (
+    MediaResponse,
+    MediaOut,
+    DirectUploadRequest,
+    DirectUploadResponse,
+    CompleteUploadRequest,
+    FinalizeUploadRequest,
+)
+from database.database import get_db, get_read_db
 
 
 router = APIRouter(prefix="/stored-media", tags=["stored-media"])
 
+@router.get("/cache/stats")
+async def url_cache_stats(current_user: UserPrincipal = Depends(get_token_principal)):
+    """Presigned URL cache counters (admins/owners only)"""
+    if current_user.role not in [RoleEnum.admin.value, RoleEnum.owner.value]:
+        raise HTTPException(status_code=403, detail="Not authorized to view cache stats")
+    return get_url_cache_stats()
+
+
 @router.get("/{media_id}", response_model=MediaResponse)
 async def get_media_url(
     media_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Return presigned URL for media by ID"""
     try:
@@ -31,7 +55,7 @@ async def get_media_url(
 
         # 2. generate presigned URL
         try:
-            url = get_presigned_url(media.object_key)
+            url = await get_presigned_url(media.object_key)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Could not generate URL: {str(e)}")
 
@@ -50,7 +74,7 @@ async def get_media_url(
 async def store_media(
     image: Optional[UploadFile] = File(None),
     video: Optional[UploadFile] = File(None),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_token_principal),
     db: AsyncSession = Depends(get_db),
 ):
     """Store media in bucket"""
@@ -107,3 +131,75 @@ async def store_media(
         if video_key:
             await delete_media_file(video_key)
         raise HTTPException(status_code=500, detail=f"Error uploading media: {str(e)}")
+
+
+@router.post("/uploads", response_model=DirectUploadResponse)
+async def create_upload(
+    request: DirectUploadRequest,
+    current_user: UserPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Step 1 of a direct upload: get presigned URL(s) to upload straight to the bucket.
+    The returned upload_token is later passed to a finalize endpoint.
+    """
+    try:
+        response = await create_direct_upload(
+            db, current_user.id, request.filename, request.content_type, request.size
+        )
+        await db.commit()
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Could not create upload: {str(e)}")
+
+
+@router.post("/uploads/complete")
+async def complete_upload(
+    request: CompleteUploadRequest,
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    """Step 2 (multipart only): stitch the uploaded parts together"""
+    parts = [{"PartNumber": part.part_number, "ETag": part.etag} for part in request.parts]
+    object_key = await complete_direct_upload(request.upload_token, current_user.id, parts)
+    return {"message": "Upload completed", "object_key": object_key}
+
+
+@router.post("/uploads/finalize", response_model=MediaOut)
+async def finalize_upload(
+    request: FinalizeUploadRequest,
+    current_user: UserPrincipal = Depends(get_token_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """Step 3: verify a direct upload and record it as stored media"""
+    # check role
+    if current_user.role != RoleEnum.owner.value:
+        raise HTTPException(status_code=403, detail="Only owners can upload media")
+
+    # finalize is idempotent: a retried call returns the row recorded the first time
+    object_key = direct_upload_key(request.upload_token, current_user.id)
+    existing = (await db.execute(select(Media).where(Media.object_key == object_key))).scalars().first()
+    if existing:
+        return MediaOut.from_orm(existing)
+
+    object_key, media_type = await finalize_direct_upload(db, request.upload_token, current_user.id)
+
+    try:
+        media = Media(
+            owner_id=current_user.id,
+            object_key=object_key,
+            media_type=media_type,
+        )
+        db.add(media)
+        await db.flush()
+        await db.refresh(media)
+
+        response = MediaOut.from_orm(media)
+        await db.commit()
+        return response
+    except Exception as e:
+        await db.rollback()
+        await delete_media_file(object_key)
+        raise HTTPException(status_code=500, detail=f"Error recording media: {str(e)}")
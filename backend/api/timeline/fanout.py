@@ -0,0 +1,213 @@
+import asyncio
+import os
+import random
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, or_, and_, func
+
+from api.community.models import Community, community_members
+from api.post.models import Post
+from api.timeline.models import TimelineFanoutJob
+from api.timeline.service import push_to_timelines, TIMELINE_FANOUT_LIMIT
+from database.database import AsyncSessionLocal
+
+TIMELINE_FANOUT_WORKER_ENABLED = os.getenv("TIMELINE_FANOUT_WORKER_ENABLED", "true").lower() == "true"
+# Members pushed per transaction
+TIMELINE_FANOUT_CHUNK = int(os.getenv("TIMELINE_FANOUT_CHUNK", "500"))
+# Jobs claimed per poll
+TIMELINE_FANOUT_BATCH = int(os.getenv("TIMELINE_FANOUT_BATCH", "10"))
+TIMELINE_FANOUT_POLL_INTERVAL = float(os.getenv("TIMELINE_FANOUT_POLL_INTERVAL", "2"))
+TIMELINE_FANOUT_MAX_ATTEMPTS = int(os.getenv("TIMELINE_FANOUT_MAX_ATTEMPTS", "8"))
+# Retry n waits about TIMELINE_FANOUT_BACKOFF_BASE * 2^(n-1) seconds (with jitter), capped at 10 minutes
+TIMELINE_FANOUT_BACKOFF_BASE = float(os.getenv("TIMELINE_FANOUT_BACKOFF_BASE", "5"))
+# A job claimed by a worker that died is picked up again after this long; renewed after every chunk
+TIMELINE_FANOUT_LEASE_SECONDS = float(os.getenv("TIMELINE_FANOUT_LEASE_SECONDS", "60"))
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(600, TIMELINE_FANOUT_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class TimelineFanoutWorker:
+    """
+    Pushes new community posts to their members' home timelines in the background.
+    Jobs are claimed with FOR UPDATE SKIP LOCKED plus a lease, like the email
+    worker. Each chunk of members is pushed in user_id order, and the job's
+    progress is saved in that chunk's transaction. A failed job is retried with
+    backoff and resumes where it stopped.
+    """
+
+    def __init__(self, chunk_size: int = TIMELINE_FANOUT_CHUNK, batch_size: int = TIMELINE_FANOUT_BATCH):
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+        self.jobs_done = 0
+        self.retried = 0
+        self.failed = 0
+        self.pushed = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout=10)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+            self._task = None
+
+    def notify(self) -> None:
+        """Poll right away instead of waiting for the next interval (call after commit)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                processed = await self.process_batch()
+            except Exception as e:
+                print(f"Timeline fan-out batch failed: {e}")
+                processed = 0
+            if processed >= self.batch_size:
+                continue  # more work is likely waiting
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=TIMELINE_FANOUT_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _claim(self):
+        async with AsyncSessionLocal() as db:
+            due = (
+                select(TimelineFanoutJob.id)
+                .where(
+                    or_(
+                        and_(TimelineFanoutJob.status == "pending", TimelineFanoutJob.next_attempt_at <= func.now()),
+                        and_(TimelineFanoutJob.status == "running", TimelineFanoutJob.locked_until < func.now()),
+                    )
+                )
+                .order_by(TimelineFanoutJob.next_attempt_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            result = await db.execute(
+                update(TimelineFanoutJob)
+                .where(TimelineFanoutJob.id.in_(due.scalar_subquery()))
+                .values(
+                    status="running",
+                    attempts=TimelineFanoutJob.attempts + 1,
+                    locked_until=func.now() + timedelta(seconds=TIMELINE_FANOUT_LEASE_SECONDS),
+                )
+                .returning(
+                    TimelineFanoutJob.id, TimelineFanoutJob.post_id, TimelineFanoutJob.community_id,
+                    TimelineFanoutJob.author_id, TimelineFanoutJob.last_user_id, TimelineFanoutJob.attempts,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            jobs = result.all()
+            await db.commit()
+            return jobs
+
+    async def process_batch(self) -> int:
+        """Claim and run one batch of jobs; returns how many were attempted"""
+        jobs = await self._claim()
+        for job in jobs:
+            try:
+                await self._run_job(job)
+            except Exception as e:
+                await self._record_failure(job, str(e))
+        return len(jobs)
+
+    async def _still_fans_out(self, job) -> bool:
+        """The post may have been deleted or made private, or the community outgrown push, since it was queued"""
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(Post.is_active, Post.is_public, Community.member_count)
+                .join(Community, Community.id == Post.community_id)
+                .where(Post.id == job.post_id)
+            )).first()
+        return bool(row and row.is_active and row.is_public and (row.member_count or 0) <= TIMELINE_FANOUT_LIMIT)
+
+    async def _run_job(self, job) -> None:
+        after = job.last_user_id
+        if await self._still_fans_out(job):
+            while True:
+                async with AsyncSessionLocal() as db:
+                    members = select(community_members.c.user_id).where(
+                        community_members.c.community_id == job.community_id,
+                        community_members.c.user_id != job.author_id,  # pushed with the post itself
+                    )
+                    if after is not None:
+                        members = members.where(community_members.c.user_id > after)
+                    chunk = (await db.execute(
+                        members.order_by(community_members.c.user_id).limit(self.chunk_size)
+                    )).scalars().all()
+                    if not chunk:
+                        break
+
+                    await push_to_timelines(db, job.post_id, chunk)
+                    after = chunk[-1]
+                    await db.execute(
+                        update(TimelineFanoutJob)
+                        .where(TimelineFanoutJob.id == job.id)
+                        .values(
+                            last_user_id=after,
+                            locked_until=func.now() + timedelta(seconds=TIMELINE_FANOUT_LEASE_SECONDS),
+                        )
+                    )
+                    await db.commit()
+                self.pushed += len(chunk)
+                if len(chunk) < self.chunk_size:
+                    break
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(TimelineFanoutJob)
+                .where(TimelineFanoutJob.id == job.id)
+                .values(status="done", finished_at=func.now(), locked_until=None, last_error=None)
+            )
+            await db.commit()
+        self.jobs_done += 1
+
+    async def _record_failure(self, job, error: str) -> None:
+        values = {"locked_until": None, "last_error": error[:2000]}
+        if job.attempts >= TIMELINE_FANOUT_MAX_ATTEMPTS:
+            values["status"] = "failed"
+            self.failed += 1
+            print(f"Timeline fan-out of post {job.post_id} failed permanently after {job.attempts} attempt(s): {error}")
+        else:
+            values["status"] = "pending"
+            values["next_attempt_at"] = func.now() + timedelta(seconds=retry_delay(job.attempts))
+            self.retried += 1
+            print(f"Timeline fan-out of post {job.post_id} attempt {job.attempts} failed, will retry: {error}")
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(TimelineFanoutJob).where(TimelineFanoutJob.id == job.id).values(**values))
+                await db.commit()
+        except Exception as e:
+            # the lease runs out and the job is claimed again
+            print(f"Recording fan-out failure for post {job.post_id} failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "jobs_done": self.jobs_done,
+            "retried": self.retried,
+            "failed": self.failed,
+            "pushed": self.pushed,
+        }
+
+
+timeline_fanout_worker = TimelineFanoutWorker()
@@ -0,0 +1,42 @@
+import uuid
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Index, func, text
+from database.database import Base
+
+
+class UserTimeline(Base):
+    __tablename__ = "user_timelines"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # Newest first, capped at TIMELINE_MAX_LENGTH by the fan-out statement itself
+    post_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default=text("'{}'"))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class TimelineFanoutJob(Base):
+    """Outbox row: written with the post, pushed to community members by the fan-out worker"""
+    __tablename__ = "timeline_fanout_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    post_id = Column(UUID(as_uuid=True), ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, unique=True)
+    community_id = Column(UUID(as_uuid=True), nullable=False)
+    author_id = Column(UUID(as_uuid=True), nullable=False)
+    # Members are pushed in user_id order; a retry resumes after the last finished chunk
+    last_user_id = Column(UUID(as_uuid=True), nullable=True)
+
+    status = Column(String(20), nullable=False, default="pending", server_default="pending")  # pending|running|done|failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # lease held by a worker, renewed per chunk
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_timeline_fanout_jobs_due",
+            "next_attempt_at",
+            postgresql_where=text("status IN ('pending', 'running')"),
+        ),
+    )
@@ -0,0 +1,212 @@
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import select, desc, text, tuple_, literal, and_, or_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.community.models import Community, community_members
+from api.post.models import Post
+from api.post.pagination import encode_cursor, decode_cursor
+from api.timeline.models import TimelineFanoutJob
+
+# Posts kept per home timeline; older entries fall off the end
+TIMELINE_MAX_LENGTH = int(os.getenv("TIMELINE_MAX_LENGTH", "800"))
+# Communities above this size are not fanned out on write; members pull them on read
+TIMELINE_FANOUT_LIMIT = int(os.getenv("TIMELINE_FANOUT_LIMIT", "10000"))
+
+# Pushes the post onto each recipient's capped timeline array, locking rows in user_id
+# order so concurrent fan-outs into overlapping member sets cannot deadlock. Recipients
+# that already have the post are left alone, so a retried chunk never duplicates it.
+PUSH_SQL = text("""
+    INSERT INTO user_timelines (user_id, post_ids, updated_at)
+    SELECT recipient, ARRAY[CAST(:post_id AS uuid)], now()
+    FROM unnest(CAST(:recipients AS uuid[])) AS r(recipient)
+    ORDER BY recipient
+    ON CONFLICT (user_id) DO UPDATE
+    SET post_ids = (ARRAY[CAST(:post_id AS uuid)] || user_timelines.post_ids)[1:CAST(:cap AS integer)],
+        updated_at = now()
+    WHERE NOT (CAST(:post_id AS uuid) = ANY(user_timelines.post_ids))
+""")
+
+# Slice of a timeline after an anchor; the anchor keeps offsets stable while new posts are prepended.
+# anchored is false once enough new posts have pushed the anchor off the capped array.
+TIMELINE_SLICE_SQL = text("""
+    SELECT post_ids[1] AS head,
+           CAST(:anchor AS uuid) IS NULL OR CAST(:anchor AS uuid) = ANY(post_ids) AS anchored,
+           CASE WHEN CAST(:anchor AS uuid) IS NULL
+                THEN post_ids[1:CAST(:take AS integer)]
+                ELSE post_ids[array_position(post_ids, CAST(:anchor AS uuid)) + CAST(:consumed AS integer)
+                              : array_position(post_ids, CAST(:anchor AS uuid)) + CAST(:consumed AS integer)
+                                + CAST(:take AS integer) - 1]
+           END AS page
+    FROM user_timelines
+    WHERE user_id = :user_id
+""")
+
+
+async def push_to_timelines(db: AsyncSession, post_id: UUID, recipients: List[UUID]) -> None:
+    """Prepend post_id to each recipient's timeline. Runs inside the caller's transaction."""
+    if recipients:
+        await db.execute(
+            PUSH_SQL, {"post_id": str(post_id), "recipients": sorted(recipients), "cap": TIMELINE_MAX_LENGTH}
+        )
+
+
+async def fan_out_post(db: AsyncSession, post: Post, member_count: Optional[int] = None) -> bool:
+    """
+    Fan a new post out to home timelines. The author's own timeline is pushed right
+    away; public posts in communities up to TIMELINE_FANOUT_LIMIT members also get a
+    TimelineFanoutJob, which the fan-out worker pushes to every member in chunks
+    (large communities are merged in on read). Runs inside the caller's transaction,
+    so the job commits with the post; returns True when a job was queued (call
+    timeline_fanout_worker.notify() after committing).
+    """
+    await push_to_timelines(db, post.id, [post.author_id])
+
+    push_to_members = (
+        post.community_id is not None
+        and post.is_public
+        and member_count is not None
+        and member_count <= TIMELINE_FANOUT_LIMIT
+    )
+    if push_to_members:
+        db.add(TimelineFanoutJob(post_id=post.id, community_id=post.community_id, author_id=post.author_id))
+    return push_to_members
+
+
+def _decode_timeline_cursor(cursor: Optional[str]) -> Tuple[Optional[str], int, Optional[tuple]]:
+    if not cursor:
+        return None, 0, None
+    payload = decode_cursor(cursor)
+    try:
+        keyset = (datetime.fromisoformat(payload["t"]), UUID(payload["id"]))
+        return payload.get("a"), int(payload["n"]), keyset
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def read_timeline(
+    db: AsyncSession, user_id: UUID, cursor: Optional[str], limit: int
+) -> Tuple[List[Post], bool, Optional[str]]:
+    """
+    Read one page of a user's home timeline.
+    Pushed entries come from the precomputed array (an O(page) slice, no join);
+    posts from large communities are pulled with a keyset query and merged in.
+    Once the cursor's anchor has fallen off the capped array, the pushed side
+    continues with a keyset query over the posts fan-out would have pushed.
+    Returns: (posts, has_more, next_cursor)
+    """
+    anchor, consumed, keyset = _decode_timeline_cursor(cursor)
+    take = limit + 1
+
+    # 1) pushed entries
+    row = (await db.execute(
+        TIMELINE_SLICE_SQL,
+        {"user_id": user_id, "anchor": anchor, "consumed": consumed, "take": take},
+    )).first()
+    push_ids: List[UUID] = []
+    anchor_lost = False
+    if row is not None:
+        push_ids = list(row.page or [])
+        if anchor is None and row.head is not None:
+            anchor = str(row.head)
+        anchor_lost = not row.anchored
+
+    older = None
+    if keyset:
+        older = (
+            tuple_(Post.created_at, Post.id)
+            < tuple_(literal(keyset[0], Post.created_at.type), literal(keyset[1], Post.id.type))
+        )
+
+    pushed: List[Post] = []
+    if anchor_lost and older is not None:
+        # the anchor, and every older entry after it, fell off the capped array; continue
+        # below the cursor's keyset straight from what fan-out pushes instead of ending here
+        small_communities = (
+            select(community_members.c.community_id)
+            .join(Community, Community.id == community_members.c.community_id)
+            .where(community_members.c.user_id == user_id, Community.member_count <= TIMELINE_FANOUT_LIMIT)
+        )
+        res = await db.execute(
+            select(Post)
+            .options(selectinload(Post.author))
+            .where(
+                older,
+                Post.is_active == True,
+                or_(
+                    Post.author_id == user_id,
+                    and_(Post.is_public == True, Post.community_id.in_(small_communities)),
+                ),
+            )
+            .order_by(desc(Post.created_at), desc(Post.id))
+            .limit(take)
+        )
+        pushed = res.scalars().all()
+    elif push_ids:
+        # entries were pushed at write time; re-check visibility now, since the post
+        # may have gone private or the reader may have left its community since
+        member_of = select(community_members.c.community_id).where(community_members.c.user_id == user_id)
+        res = await db.execute(
+            select(Post)
+            .options(selectinload(Post.author))
+            .where(
+                Post.id.in_(push_ids),
+                Post.is_active == True,
+                or_(
+                    Post.author_id == user_id,
+                    and_(
+                        Post.is_public == True,
+                        or_(Post.community_id.is_(None), Post.community_id.in_(member_of)),
+                    ),
+                ),
+            )
+        )
+        pushed = res.scalars().all()
+
+    # 2) pulled entries from large communities (fan-out-on-read)
+    large_communities = (
+        select(community_members.c.community_id)
+        .join(Community, Community.id == community_members.c.community_id)
+        .where(community_members.c.user_id == user_id, Community.member_count > TIMELINE_FANOUT_LIMIT)
+    )
+    pull_stmt = (
+        select(Post)
+        .options(selectinload(Post.author))
+        .where(
+            Post.community_id.in_(large_communities),
+            Post.is_active == True,
+            Post.is_public == True,
+        )
+        .order_by(desc(Post.created_at), desc(Post.id))
+        .limit(take)
+    )
+    if older is not None:
+        pull_stmt = pull_stmt.where(older)
+    push_set = set(push_ids) | {p.id for p in pushed}
+    pulled = [p for p in (await db.execute(pull_stmt)).scalars().all() if p.id not in push_set]
+
+    # 3) merge newest first
+    merged = sorted([*pushed, *pulled], key=lambda p: (p.created_at, p.id), reverse=True)
+    page = merged[:limit]
+    has_more = len(merged) > limit or len(push_ids) == take
+
+    # advance past every pushed entry up to the last one shown (dead entries included)
+    position = {post_id: index for index, post_id in enumerate(push_ids)}
+    shown = [position[p.id] for p in page if p.id in position]
+    if shown:
+        consumed += max(shown) + 1
+    elif not pushed:
+        consumed += len(push_ids)
+
+    next_cursor = None
+    if page:
+        last = page[-1]
+        next_cursor = encode_cursor(
+            {"a": anchor, "n": consumed, "t": last.created_at.isoformat(), "id": str(last.id)}
+        )
+    return page, has_more, next_cursor
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import get_read_db
+from api.user.auth import get_current_principal
+from api.user.principal_cache import UserPrincipal
+from api.post.schemas import FeedResponse
+from api.post.views import get_user_interactions
+from api.post.counters import apply_pending_counts
+from api.cloudflare.r2_service import presign_media_fields
+from api.timeline.service import read_timeline
+
+router = APIRouter(prefix="/timeline", tags=["timeline"])
+
+
+@router.get("/home", response_model=FeedResponse)
+async def get_home_timeline(
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
+    limit: int = Query(10, ge=1, le=50, description="Number of posts to fetch"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    """Personalized home feed built from the user's precomputed timeline"""
+    try:
+        posts, has_more, next_cursor = await read_timeline(db, current_user.id, cursor, limit)
+
+        post_ids = [p.id for p in posts]
+        liked_posts, saved_posts = await get_user_interactions(db, current_user.id, post_ids)
+        for p in posts:
+            p.is_liked = p.id in liked_posts
+            p.is_saved = p.id in saved_posts
+        await apply_pending_counts(db, posts)
+        await presign_media_fields(posts)
+
+        return FeedResponse(posts=posts, has_more=has_more, next_cursor=next_cursor)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Timeline retrieval failed: {str(e)}")
@@ -1,20 +1,20 @@
 import os
+import time
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from uuid import UUID
 
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-
 from api.user import models, schemas
-from database.database import get_db
+from api.user.principal_cache import UserPrincipal, principal_cache
+from api.user.password_pool import password_pool
+from api.user.password_policy import password_policy, PASSWORD_HASH_TARGET_MS
+from database.database import get_db, current_user_id
 
 load_dotenv()
 
@@ -23,23 +23,39 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "fallback-secret-key")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))  # Short-lived
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))  # Longer-lived
+# Role / verification claims are trusted without a lookup only while the token is
+# younger than this. Older tokens go through the principal cache (USER_CACHE_TTL_SECONDS),
+# so a demotion or deactivation applied on another worker takes effect within
+# max(TOKEN_CLAIMS_MAX_AGE_SECONDS, USER_CACHE_TTL_SECONDS).
+TOKEN_CLAIMS_MAX_AGE_SECONDS = int(os.getenv("TOKEN_CLAIMS_MAX_AGE_SECONDS", "60"))
 
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Token security
 security = HTTPBearer()
 
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    """Hash a password with the configured policy (on the password pool, off the event loop)."""
+    return await password_pool.run(password_policy.hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash (on the password pool, off the event loop)."""
+    return await password_pool.run(password_policy.verify, plain_password, hashed_password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a fresh hash when the stored one is outdated."""
+    return await password_pool.run(password_policy.verify_and_update, plain_password, hashed_password)
+
+
+async def tune_password_hashing():
+    """Startup hook: auto-tune the hash cost when PASSWORD_HASH_TARGET_MS is set."""
+    if PASSWORD_HASH_TARGET_MS > 0:
+        try:
+            await password_pool.run(password_policy.auto_tune, PASSWORD_HASH_TARGET_MS)
+        except Exception as e:
+            print(f"Password hash auto-tune failed, keeping cost {password_policy.cost}: {e}")
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -51,8 +67,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    # Always set expiration
+    # Always set expiration; iat bounds how long claims are trusted (get_token_principal)
     to_encode.update({"exp": expire})
+    to_encode.setdefault("iat", datetime.utcnow())
 
     # Only set type=access if user didn’t already provide one
     if "type" not in to_encode:
@@ -62,6 +79,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def user_token_claims(user: models.User) -> dict:
+    """Access-token claims that let authorization skip the users lookup (see get_token_principal)."""
+    return {
+        "sub": str(user.id),
+        "role": user.role,
+        "ev": bool(user.is_email_verified),
+        "ver": user.token_version or 0,
+    }
+
+
+def bump_token_version(user: models.User) -> int:
+    """Invalidate claims in previously issued access tokens; call before committing the change."""
+    user.token_version = (user.token_version or 0) + 1
+    return user.token_version
+
+
 def create_refresh_token(data: dict):
     """Create a JWT refresh token."""
     to_encode = data.copy()
@@ -71,8 +104,7 @@ def create_refresh_token(data: dict):
     return encoded_jwt
 
 
-async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Verify JWT token and return user ID."""
+def _decode_bearer(credentials: HTTPAuthorizationCredentials) -> Tuple[UUID, dict]:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -82,13 +114,21 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
-        if user_id is None:
+        # refresh, upload and verification tokens are signed with the same key
+        if user_id is None or payload.get("type") != "access":
             raise credentials_exception
         token_data = schemas.TokenData(user_id=UUID(user_id))
     except JWTError:
         raise credentials_exception
     
-    return token_data.user_id
+    return token_data.user_id, payload
+
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Verify JWT token and return user ID."""
+    user_id, _ = _decode_bearer(credentials)
+    current_user_id.set(user_id)
+    return user_id
 
 
 async def get_current_user(
@@ -105,52 +145,89 @@ async def get_current_user(
             detail="User not found"
         )
     
+    principal_cache.put(UserPrincipal.from_user(user))
     return user
 
 
-# Email service function (customize based on your email provider)
-async def send_verification_email_service(email: str, username: str, token: str):
-    verification_url = f"{os.getenv('FRONTEND_URL')}/verify-email?token={token}"
-    
-    subject = "Verify Your CookNet Email"
-    body = f"""
-    Hi {username},
-
-    Please verify your email address by clicking the link below:
-    {verification_url}
+async def resolve_principal(db: AsyncSession, user_id: UUID, use_cache: bool = True) -> UserPrincipal:
+    """Load a user's principal through the per-process cache (or straight from the DB)."""
+    principal = principal_cache.get(user_id) if use_cache else None
+    if principal is None:
+        result = await db.execute(
+            select(
+                models.User.id,
+                models.User.role,
+                models.User.is_active,
+                models.User.is_email_verified,
+                models.User.token_version,
+            ).where(models.User.id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        principal = UserPrincipal.from_user(row)
+        principal_cache.put(principal)
+
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+    return principal
+
+
+async def get_current_principal(
+    user_id: UUID = Depends(verify_token),
+    db: AsyncSession = Depends(get_db)
+) -> UserPrincipal:
+    """
+    Resolve the authenticated user as a slim principal (id, role, flags).
+    Served from a per-process TTL cache, so most requests skip the users lookup.
+    """
+    return await resolve_principal(db, user_id)
 
-    This link will expire in 24 hours.
 
-    Best regards,
-    CookNet Team
+async def get_token_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> UserPrincipal:
     """
-
-    try:
-        message = Mail(
-            from_email=os.getenv("SENDGRID_SENDER_EMAIL"),
-            to_emails=email,
-            subject=subject,
-            plain_text_content=body
+    Authorize from the access token's own claims (role, ev, ver) without touching the DB.
+    Falls back to resolve_principal when the token predates claims, is older than
+    TOKEN_CLAIMS_MAX_AGE_SECONDS, or its version is older than the newest
+    token_version this process has seen for the user.
+    """
+    user_id, payload = _decode_bearer(credentials)
+    current_user_id.set(user_id)
+    version = payload.get("ver")
+    issued_at = payload.get("iat")
+    fresh = (
+        isinstance(issued_at, (int, float))
+        and time.time() - issued_at <= TOKEN_CLAIMS_MAX_AGE_SECONDS
+    )
+    if fresh and isinstance(version, int) and "role" in payload and version >= principal_cache.known_version(user_id):
+        # deactivation bumps token_version, so a current token implies an active user
+        return UserPrincipal(
+            id=user_id,
+            role=payload["role"],
+            is_active=True,
+            is_email_verified=bool(payload.get("ev")),
+            token_version=version,
         )
-
-        sg = SendGridAPIClient(os.getenv("SENDGRID_API_KEY"))
-        response = sg.send(message)
-
-        # Optional: log response details
-        print(f"Email sent to {email}, status: {response.status_code}")
-        if response.status_code == 202:
-            return True
-        return False
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
+    return await resolve_principal(db, user_id)
 
 
 # To check email verification for protected routes
-def require_verified_email(current_user: models.User = Depends(get_current_user)):
+async def require_verified_email(
+    current_user: UserPrincipal = Depends(get_token_principal),
+    db: AsyncSession = Depends(get_db)
+):
     """
     Dependency to ensure user has verified email for certain endpoints.
     """
+    if not current_user.is_email_verified:
+        # the token may predate verification done on another worker; check before refusing
+        current_user = await resolve_principal(db, current_user.id, use_cache=False)
     if not current_user.is_email_verified:
         raise HTTPException(
             status_code=403, 
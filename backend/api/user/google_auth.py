@@ -0,0 +1,157 @@
+import asyncio
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from api.http_client import get_http_client
+
+load_dotenv()
+
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_JWKS_URL = os.getenv("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+# Used when the certs response has no usable Cache-Control max-age
+JWKS_DEFAULT_MAX_AGE = int(os.getenv("GOOGLE_JWKS_DEFAULT_MAX_AGE", "3600"))
+# Start a background refresh this long before the cached keys expire
+JWKS_REFRESH_MARGIN = int(os.getenv("GOOGLE_JWKS_REFRESH_MARGIN", "300"))
+# An unknown kid forces a refetch at most this often (keys rotate, tokens can't spam us)
+JWKS_MIN_REFETCH_INTERVAL = 30
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class KeySource(ABC):
+    """Where Google's signing keys come from; swap in StaticKeySource for tests."""
+
+    @abstractmethod
+    async def get_key(self, kid: str) -> Optional[dict]:
+        ...
+
+
+class StaticKeySource(KeySource):
+    """Fixed JWKS (e.g. a locally generated test key pair)."""
+
+    def __init__(self, jwks: dict):
+        self._keys = {key["kid"]: key for key in jwks.get("keys", [])}
+
+    async def get_key(self, kid: str) -> Optional[dict]:
+        return self._keys.get(kid)
+
+
+class HttpJwksSource(KeySource):
+    """
+    JWKS fetched over HTTP and cached for the response's Cache-Control max-age.
+    Keys are refreshed in the background shortly before they expire, and stale
+    keys keep serving if a refresh fails.
+    """
+
+    def __init__(self, url: str = GOOGLE_JWKS_URL, client: Optional[httpx.AsyncClient] = None):
+        self.url = url
+        self.client = client
+        self._keys: Dict[str, dict] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _fetch(self) -> None:
+        client = self.client or get_http_client()
+        response = await client.get(self.url)
+        response.raise_for_status()
+
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else JWKS_DEFAULT_MAX_AGE
+        self._keys = {key["kid"]: key for key in response.json().get("keys", [])}
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + max_age
+
+    async def refresh(self) -> None:
+        """Fetch the key set; concurrent callers share one request"""
+        if self._lock is None:
+            # created lazily so it binds to the running loop
+            self._lock = asyncio.Lock()
+        fetched_at = self._fetched_at
+        async with self._lock:
+            if self._fetched_at != fetched_at:
+                return  # someone else refreshed while we waited
+            await self._fetch()
+
+    async def _background_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            print(f"Google JWKS background refresh failed: {e}")
+
+    async def get_key(self, kid: str) -> Optional[dict]:
+        now = time.monotonic()
+        if not self._keys or now >= self._expires_at:
+            try:
+                await self.refresh()
+            except Exception as e:
+                if not self._keys:
+                    raise
+                print(f"Google JWKS refresh failed, using cached keys: {e}")
+        elif now >= self._expires_at - JWKS_REFRESH_MARGIN and (
+            self._refresh_task is None or self._refresh_task.done()
+        ):
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._fetched_at >= JWKS_MIN_REFETCH_INTERVAL:
+            # possibly a freshly rotated key
+            await self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+
+key_source: KeySource = HttpJwksSource()
+
+
+def set_key_source(source: KeySource) -> None:
+    """Replace the Google key source (tests use StaticKeySource)"""
+    global key_source
+    key_source = source
+
+
+async def verify_google_id_token(token: str, audience: Optional[str] = GOOGLE_CLIENT_ID) -> dict:
+    """
+    Verify a Google ID token locally (signature, audience, issuer, expiry)
+    and return its claims.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid Google token")
+
+    try:
+        key = await key_source.get_key(header.get("kid"))
+    except Exception as e:
+        print(f"Google key fetch failed: {e}")
+        raise HTTPException(status_code=503, detail="Google sign-in is temporarily unavailable")
+    if key is None:
+        raise HTTPException(status_code=400, detail="Invalid Google token")
+
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=audience,
+            issuer=GOOGLE_ISSUERS,
+            options={"verify_at_hash": False},
+        )
+    except JWTError as e:
+        print(f"Google verification failed: {e}")
+        raise HTTPException(status_code=400, detail="Invalid Google token")
+
+    if claims.get("email") and claims.get("email_verified") not in (True, "true"):
+        raise HTTPException(status_code=400, detail="Google email is not verified")
+    return claims
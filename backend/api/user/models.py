@@ -21,6 +21,9 @@ class User(Base):
     is_email_verified = Column(Boolean, default=False, nullable=False)
     verification_email_sent = Column(Boolean, default=False)
 
+    # Bumped whenever role / activation / verification change; access tokens carry it as "ver"
+    token_version = Column(Integer, default=0, nullable=False, server_default="0")
+
     # Optional fields
     profile_image = Column(String(255), nullable=True)  # URL to profile image
     created_at = Column(DateTime(timezone=True), server_default=func.now())
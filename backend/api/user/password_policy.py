@@ -0,0 +1,107 @@
+import os
+import time
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+# Scheme used for new hashes; hashes in the other supported scheme still verify and are upgraded on login
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt").lower()
+# Work factor: bcrypt rounds (log2) or argon2 time_cost. Empty = scheme default below
+PASSWORD_HASH_COST = os.getenv("PASSWORD_HASH_COST", "")
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+# When > 0, pick the highest cost whose verification fits this budget at startup
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "0"))
+
+SUPPORTED_SCHEMES = ("bcrypt", "argon2")
+# (default, floor, ceiling) per scheme; auto-tuning never leaves this range
+COST_LIMITS = {
+    "bcrypt": (12, 10, 16),
+    "argon2": (3, 2, 10),
+}
+
+
+class PasswordPolicy:
+    """
+    Builds the passlib CryptContext from deployment settings. Hashes made with
+    another scheme or a lower cost report needs_update, so they are rehashed
+    the next time the user logs in.
+    """
+
+    def __init__(self, scheme: str = PASSWORD_HASH_SCHEME, cost: Optional[int] = None):
+        if scheme not in SUPPORTED_SCHEMES:
+            raise ValueError(f"Unsupported PASSWORD_HASH_SCHEME: {scheme}")
+        default, floor, ceiling = COST_LIMITS[scheme]
+        self.scheme = scheme
+        self.cost = max(floor, min(ceiling, cost if cost is not None else default))
+        self.measured_ms: Optional[float] = None
+        self.target_ms: Optional[float] = None
+        self.tuned = False
+        self.context = self._build(self.cost)
+
+    def _build(self, cost: int) -> CryptContext:
+        schemes = [self.scheme] + [name for name in SUPPORTED_SCHEMES if name != self.scheme]
+        settings = {
+            # min_rounds makes weaker stored hashes report needs_update
+            f"{self.scheme}__default_rounds": cost,
+            f"{self.scheme}__min_rounds": cost,
+        }
+        if self.scheme == "argon2":
+            settings["argon2__memory_cost"] = ARGON2_MEMORY_COST
+        return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+    def _measure_verify_ms(self, context: CryptContext, samples: int = 2) -> float:
+        sample = "cost-calibration-password"
+        hashed = context.hash(sample)
+        best = None
+        for _ in range(samples):
+            started = time.perf_counter()
+            context.verify(sample, hashed)
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def auto_tune(self, target_ms: float = PASSWORD_HASH_TARGET_MS) -> int:
+        """
+        Blocking: raise the cost step by step from the floor while a verification
+        stays within target_ms, then switch to that cost. Returns the chosen cost.
+        """
+        _, floor, ceiling = COST_LIMITS[self.scheme]
+        cost = floor
+        measured = self._measure_verify_ms(self._build(cost))
+        while cost < ceiling:
+            # bcrypt doubles per round; argon2 grows linearly with time_cost
+            growth = 2.0 if self.scheme == "bcrypt" else (cost + 1) / cost
+            if measured * growth > target_ms:
+                break
+            cost += 1
+            measured = self._measure_verify_ms(self._build(cost))
+
+        self.cost = cost
+        self.measured_ms = round(measured, 1)
+        self.target_ms = target_ms
+        self.tuned = True
+        self.context = self._build(cost)
+        print(f"Password hashing tuned: {self.scheme} cost={cost} verify≈{self.measured_ms}ms (target {target_ms}ms)")
+        return cost
+
+    def hash(self, password: str) -> str:
+        return self.context.hash(password)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self.context.verify(password, hashed)
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(valid, replacement hash or None when the stored hash is already current)"""
+        return self.context.verify_and_update(password, hashed)
+
+    def describe(self) -> dict:
+        return {
+            "scheme": self.scheme,
+            "cost": self.cost,
+            "tuned": self.tuned,
+            "measured_verify_ms": self.measured_ms,
+            "target_ms": self.target_ms,
+        }
+
+
+password_policy = PasswordPolicy(cost=int(PASSWORD_HASH_COST) if PASSWORD_HASH_COST else None)
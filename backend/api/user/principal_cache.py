@@ -0,0 +1,107 @@
+import os
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from uuid import UUID
+
+# How long a resolved user is trusted before the DB is consulted again.
+# Invalidation is per process, so this also bounds how long other workers
+# may keep serving a stale role / active flag.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+
+class UserPrincipal(NamedTuple):
+    """The slice of a user that authorization checks need"""
+    id: UUID
+    role: str
+    is_active: bool
+    is_email_verified: bool
+    token_version: int = 0
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            role=user.role,
+            is_active=bool(user.is_active),
+            is_email_verified=bool(user.is_email_verified),
+            token_version=user.token_version or 0,
+        )
+
+
+class PrincipalCache:
+    """
+    Size-bounded LRU + TTL cache of UserPrincipal keyed by user id.
+    Also remembers the newest token_version seen per user, which decides
+    whether the claims in an access token can still be trusted.
+    """
+
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_size: int = USER_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[UUID, Tuple[UserPrincipal, float]]" = OrderedDict()
+        self._versions: "OrderedDict[UUID, int]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: UUID) -> Optional[UserPrincipal]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, principal: UserPrincipal) -> None:
+        self.note_version(principal.id, principal.token_version)
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[principal.id] = (principal, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(principal.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def note_version(self, user_id: UUID, version: int) -> None:
+        if version > self._versions.get(user_id, 0):
+            self._versions[user_id] = version
+        if user_id in self._versions:
+            self._versions.move_to_end(user_id)
+            while len(self._versions) > self.max_size:
+                self._versions.popitem(last=False)
+
+    def known_version(self, user_id: UUID) -> int:
+        return self._versions.get(user_id, 0)
+
+    def invalidate(self, user_id: UUID) -> None:
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "tracked_versions": len(self._versions),
+        }
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_user_principal(user_id: UUID, token_version: Optional[int] = None) -> None:
+    """
+    Drop a cached principal after role, activation or verification changes.
+    Pass the user's new token_version so older access tokens stop being trusted.
+    """
+    principal_cache.invalidate(user_id)
+    if token_version is not None:
+        principal_cache.note_version(user_id, token_version)
@@ -1,28 +1,35 @@
-import os
-import httpx
 import secrets
+import time
 import string
 from datetime import timedelta
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import or_
+from sqlalchemy import or_, update
 from jose import JWTError, jwt
 from uuid import UUID
 
 from api.user import models, schemas
 from api.user.auth import (
     hash_password, 
-    verify_password, 
+    verify_and_update_password,
     create_access_token, 
     create_refresh_token,
+    user_token_claims,
+    bump_token_version,
     get_current_user,
+    get_token_principal,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     SECRET_KEY,
     ALGORITHM,
-    send_verification_email_service
 )
+from api.user.principal_cache import UserPrincipal, invalidate_user_principal
+from api.user.password_pool import password_pool
+from api.user.password_policy import password_policy
+from api.user.google_auth import verify_google_id_token
+from api.mail.outbox import enqueue_verification_email
+from api.mail.worker import email_worker
 from database.database import get_db
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -52,8 +59,11 @@ async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get
         if existing_username:
             raise HTTPException(status_code=400, detail="Username already taken")
 
+        # Don't hold a pooled connection while queued for the hash pool
+        await db.rollback()
+
         # Hash password
-        hashed_pw = hash_password(user.password)
+        hashed_pw = await hash_password(user.password)
 
         # Create new user
         new_user = models.User(
@@ -66,22 +76,14 @@ async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get
         )
 
         db.add(new_user)
-        await db.commit()
-        await db.refresh(new_user)
+        await db.flush()
 
-        # Automatically send verification email
-        try:
-            verification_token = create_access_token(
-                data={"sub": str(new_user.id), "type": "email_verification"},
-                expires_delta=timedelta(hours=24)
-            )
-            await send_verification_email_service(new_user.email, new_user.username, verification_token)
-            
-            new_user.verification_email_sent = True
-            await db.commit()
+        # Queue the verification email in the same transaction; the email worker delivers it
+        await enqueue_verification_email(db, new_user, idempotency_key=f"email_verification:{new_user.id}:register")
 
-        except Exception as e:
-            print(f"⚠️ Failed to send verification email: {e}")
+        await db.commit()
+        await db.refresh(new_user)
+        email_worker.notify()
 
         return new_user
     except HTTPException as e:
@@ -101,7 +103,17 @@ async def login_user(user: schemas.UserLogin, db: AsyncSession = Depends(get_db)
         result = await db.execute(select(models.User).where(models.User.email == user.email))
         db_user = result.scalars().first()
 
-        if not db_user or not verify_password(user.password, db_user.hashed_password):
+        # Give the pooled connection back before queueing for the hash pool; during a
+        # login storm the queue wait would otherwise exhaust the DB pool
+        if db_user:
+            db.expunge(db_user)
+        await db.rollback()
+
+        valid, new_hash = (False, None)
+        if db_user:
+            valid, new_hash = await verify_and_update_password(user.password, db_user.hashed_password)
+
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
@@ -113,10 +125,21 @@ async def login_user(user: schemas.UserLogin, db: AsyncSession = Depends(get_db)
                 detail="Inactive user"
             )
 
+        # Stored hash uses an old scheme/cost: upgrade it while we have the plaintext
+        if new_hash:
+            try:
+                await db.execute(
+                    update(models.User).where(models.User.id == db_user.id).values(hashed_password=new_hash)
+                )
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                print(f"Password rehash failed for user {db_user.id}: {e}")
+
         # Create tokens
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": str(db_user.id)}, expires_delta=access_token_expires
+            data=user_token_claims(db_user), expires_delta=access_token_expires
         )
         refresh_token = create_refresh_token(data={"sub": str(db_user.id)})
 
@@ -165,6 +188,7 @@ async def update_user_profile(
             current_user.username = username
         
         await db.commit()
+        invalidate_user_principal(current_user.id)
         await db.refresh(current_user)
         return current_user
     except Exception as e:
@@ -209,7 +233,7 @@ async def refresh_token(
         # Create new tokens
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": str(user.id)}, expires_delta=access_token_expires
+            data=user_token_claims(user), expires_delta=access_token_expires
         )
         refresh_token = create_refresh_token(data={"sub": str(user.id)})
         
@@ -247,8 +271,10 @@ async def register_user_with_role(
         if result.scalars().first():
             raise HTTPException(status_code=400, detail="Username already taken")
 
+        await db.rollback()
+
         # Hash password
-        hashed_pw = hash_password(user.password)
+        hashed_pw = await hash_password(user.password)
 
         # Create new user with role
         new_user = models.User(
@@ -263,37 +289,33 @@ async def register_user_with_role(
         await db.refresh(new_user)
 
         return new_user
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create role-based user: {str(e)}")
 
 
+@router.get("/password-pool/stats")
+async def password_pool_stats(current_user: UserPrincipal = Depends(get_token_principal)):
+    """Password hashing pool queue depth and latency counters (admins/owners only)"""
+    if current_user.role not in [schemas.RoleEnum.admin.value, schemas.RoleEnum.owner.value]:
+        raise HTTPException(status_code=403, detail="Not authorized to view password pool stats")
+    return {**password_pool.stats(), "policy": password_policy.describe()}
+
+
 @router.post("/google-login", response_model=schemas.Token)
 async def google_login(request: schemas.GoogleLoginRequest, db: AsyncSession = Depends(get_db)):
     """
     Authenticate user using Google OAuth token.
     """
     try:
-        # Verify Google ID token
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://oauth2.googleapis.com/tokeninfo?id_token={request.token}"
-            )
-            
-            if response.status_code != 200:
-                print(f"Google verification failed: {response.text}")
-                raise HTTPException(status_code=400, detail="Invalid Google token")
-            
-            token_info = response.json()
-            
-            # Verify token is for your app
-            google_client_id = os.getenv("GOOGLE_CLIENT_ID")
-            if token_info.get('aud') != google_client_id:
-                raise HTTPException(status_code=400, detail="Token not for this application")
+        # Verify Google ID token locally (signature, audience, issuer, expiry)
+        token_info = await verify_google_id_token(request.token)
 
         # Extract user info from verified token
         google_id = token_info['sub']
-        email = token_info['email']
+        email = token_info.get('email')
         name = token_info.get('name', '')
         picture = token_info.get('picture', '')
 
@@ -316,8 +338,10 @@ async def google_login(request: schemas.GoogleLoginRequest, db: AsyncSession = D
                 user.profile_image = picture
             if not user.is_email_verified:
                 user.is_email_verified = True
+                bump_token_version(user)
             
             await db.commit()
+            invalidate_user_principal(user.id, user.token_version)
             await db.refresh(user)
         else:
             # Create new user
@@ -340,7 +364,7 @@ async def google_login(request: schemas.GoogleLoginRequest, db: AsyncSession = D
             user = models.User(
                 username=username,
                 email=email,
-                hashed_password=hash_password(generate_random_password()),
+                hashed_password=await hash_password(generate_random_password()),
                 google_id=google_id,
                 profile_image=picture,  # Using your existing field name
                 is_email_verified=True,
@@ -354,7 +378,7 @@ async def google_login(request: schemas.GoogleLoginRequest, db: AsyncSession = D
         # Create tokens (same pattern as your login endpoint)
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": str(user.id)}, expires_delta=access_token_expires
+            data=user_token_claims(user), expires_delta=access_token_expires
         )
         refresh_token = create_refresh_token(data={"sub": str(user.id)})
 
@@ -399,20 +423,18 @@ async def send_verification_email(
         if user.is_email_verified:
             raise HTTPException(status_code=400, detail="Email already verified")
         
-        # Create verification token (expires in 24 hours)
-        verification_token = create_access_token(
-            data={"sub": str(user.id), "type": "email_verification"},
-            expires_delta=timedelta(hours=24)
-        )
-        
-        # Send email (implement based on your email service)
-        await send_verification_email_service(user.email, user.username, verification_token)
+        # Queue the email; repeated clicks within the same minute collapse into one job
+        minute = int(time.time() // 60)
+        await enqueue_verification_email(db, user, idempotency_key=f"email_verification:{user.id}:{minute}")
+        await db.commit()
+        email_worker.notify()
         
         return {"message": "Verification email sent"}
         
     except HTTPException:
         raise
     except Exception as e:
+        await db.rollback()
         print(f"Send verification email error: {e}")
         raise HTTPException(status_code=500, detail="Failed to send verification email")
 
@@ -440,7 +462,9 @@ async def verify_email(token: str, db: AsyncSession = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Email already verified")
         
         user.is_email_verified = True
+        bump_token_version(user)
         await db.commit()
+        invalidate_user_principal(user.id, user.token_version)
         await db.refresh(user)
         
         return {"message": "Email verified successfully"}
@@ -1,26 +1,299 @@
 import os
 import ssl
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Optional
+from uuid import UUID
 from fastapi import FastAPI
 from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.elements import TextClause
+from database.instrumentation import instrument_engine
+from database.read_your_writes import READ_YOUR_WRITES_SECONDS, request_last_write
 
 app = FastAPI()
 load_dotenv()
 
 CONNECTION_NEON_DB = os.getenv("CONNECTION_NEON_DB")
 DATABASE_URL = f"{os.getenv('DATABASE_URL')}{CONNECTION_NEON_DB}"
+# Full URL of a read replica (e.g. a Neon read replica endpoint); empty = all reads hit the primary
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+# Stop routing reads to the replica while it lags more than this
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+
+# Pool sizing (per process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+# Recycle before serverless Postgres drops idle connections on its side
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# asyncpg prepared statement cache; set 0 behind a transaction-mode pooler (PgBouncer)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# Server-side per-statement timeout; 0 disables (some poolers reject startup parameters)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+# SQL logging: off | sample | all
+DB_SQL_LOG = os.getenv("DB_SQL_LOG", "off").lower()
+DB_SQL_LOG_SAMPLE_RATE = float(os.getenv("DB_SQL_LOG_SAMPLE_RATE", "0.01"))
+# Always log statements slower than this (0 = off)
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
 
 ssl_context = ssl.create_default_context()
 
-engine = create_async_engine(
-    DATABASE_URL, 
-    echo=True,
-    connect_args={"ssl": ssl_context}
-) # echo for SQL logging
+# Upper bounds (ms) of the checkout wait histogram
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """How long requests wait to check a connection out of the pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.total_wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+        ms = seconds * 1000
+        for index, bound in enumerate(WAIT_BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def snapshot(self) -> dict:
+        labels = [f"le_{bound}ms" for bound in WAIT_BUCKETS_MS] + ["gt_%dms" % WAIT_BUCKETS_MS[-1]]
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait_seconds / (self.checkouts or 1) * 1000, 3),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            "wait_histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records checkout wait time in self.metrics"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.observe(time.perf_counter() - started)
+        return connection
+
+
+def _attach_sql_logging(engine: AsyncEngine, label: str) -> None:
+    if DB_SQL_LOG != "sample" and DB_SLOW_QUERY_MS <= 0:
+        return
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        context._query_started_at = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _log_statement(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context._query_started_at) * 1000
+        slow = DB_SLOW_QUERY_MS > 0 and elapsed_ms >= DB_SLOW_QUERY_MS
+        sampled = DB_SQL_LOG == "sample" and random.random() < DB_SQL_LOG_SAMPLE_RATE
+        if slow or sampled:
+            # statement only: parameters can hold credentials
+            print(f"[sql:{label}]{' SLOW' if slow else ''} {elapsed_ms:.1f}ms {' '.join(statement.split())}")
+
+
+def create_engine_from_settings(url: str, label: str = "primary", **overrides) -> AsyncEngine:
+    """Async engine configured from the DB_* settings; keyword overrides win"""
+    server_settings = {"application_name": f"cooknet-{label}"}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+
+    options = dict(
+        echo=DB_SQL_LOG == "all",
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={
+            "ssl": ssl_context,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        },
+    )
+    options.update(overrides)
+    new_engine = create_async_engine(url, **options)
+    _attach_sql_logging(new_engine, label)
+    instrument_engine(new_engine)
+    return new_engine
+
+
+def pool_metrics(target: AsyncEngine) -> dict:
+    """Checkout wait metrics plus current pool occupancy for an engine"""
+    pool = target.pool
+    stats = pool.metrics.snapshot() if isinstance(pool, TimedQueuePool) else {}
+    stats.update(
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        overflow=pool.overflow(),
+        checked_in=pool.checkedin(),
+    )
+    return stats
+
+
+engine = create_engine_from_settings(DATABASE_URL)
+replica_engine: Optional[AsyncEngine] = (
+    create_engine_from_settings(DATABASE_REPLICA_URL, label="replica") if DATABASE_REPLICA_URL else None
+)
+
+# Authenticated user of the current request (set by verify_token), for read-your-writes
+current_user_id: ContextVar[Optional[UUID]] = ContextVar("current_user_id", default=None)
+
+
+class ReplicaState:
+    """
+    Per-process view of the replica: its measured lag (re-checked at most every
+    REPLICA_LAG_CHECK_INTERVAL) and which users wrote recently. Writes served by
+    other instances are known from the request's signed last-write marker
+    (see database.read_your_writes).
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.lag_seconds: Optional[float] = None
+        self.checked_at = 0.0
+        self.last_error: Optional[str] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._recent_writes: "OrderedDict[UUID, float]" = OrderedDict()
+        self._max_users = max_users
+
+    def healthy(self) -> bool:
+        return self.lag_seconds is not None and self.lag_seconds <= REPLICA_MAX_LAG_SECONDS
+
+    async def refresh_lag(self) -> None:
+        if replica_engine is None or time.monotonic() - self.checked_at < REPLICA_LAG_CHECK_INTERVAL:
+            return
+        if self._lock is None:
+            # created lazily so it binds to the running loop
+            self._lock = asyncio.Lock()
+        if self._lock.locked():
+            return  # another request is already checking; use the last result
+        async with self._lock:
+            try:
+                async with replica_engine.connect() as conn:
+                    lag = (await conn.execute(text(
+                        "SELECT CASE WHEN pg_is_in_recovery() "
+                        "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+                        "ELSE 0 END"
+                    ))).scalar()
+                self.lag_seconds = float(lag)
+                self.last_error = None
+            except Exception as e:
+                self.lag_seconds = None
+                self.last_error = str(e)
+                print(f"Replica lag check failed, reading from primary: {e}")
+            finally:
+                self.checked_at = time.monotonic()
+
+    def note_write(self, user_id: Optional[UUID]) -> None:
+        if user_id is None:
+            return
+        marker = request_last_write.get()
+        if marker is not None:
+            marker.record(user_id)  # handed back to the client in the response
+        self._recent_writes[user_id] = time.monotonic()
+        self._recent_writes.move_to_end(user_id)
+        while len(self._recent_writes) > self._max_users:
+            self._recent_writes.popitem(last=False)
+
+    def wrote_recently(self, user_id: Optional[UUID]) -> bool:
+        marker = request_last_write.get()
+        if marker is not None and marker.covers(user_id):
+            return True
+        written_at = self._recent_writes.get(user_id) if user_id is not None else None
+        return written_at is not None and time.monotonic() - written_at < READ_YOUR_WRITES_SECONDS
+
+    def snapshot(self) -> dict:
+        return {
+            "configured": replica_engine is not None,
+            "healthy": self.healthy(),
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+            "last_error": self.last_error,
+            "recent_writers": len(self._recent_writes),
+        }
+
+
+replica_state = ReplicaState()
+
+
+class RoutingSession(Session):
+    """
+    Sends everything to the primary, except sessions opened by get_read_db, which
+    use the replica when it is healthy and the user has not written recently.
+    The choice is made once per session, at its first statement.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not self.info.get("read_only") or replica_engine is None or self._flushing:
+            return engine.sync_engine
+        if "use_replica" not in self.info:
+            self.info["use_replica"] = (
+                replica_state.healthy() and not replica_state.wrote_recently(current_user_id.get())
+            )
+        return replica_engine.sync_engine if self.info["use_replica"] else engine.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_statement_write(orm_execute_state):
+    statement = orm_execute_state.statement
+    if isinstance(statement, TextClause):
+        # raw SQL: anything that isn't a plain SELECT may write
+        wrote = not statement.text.lstrip().lower().startswith("select")
+    else:
+        wrote = orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    if wrote:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _record_user_write(session):
+    if session.info.pop("wrote", False):
+        replica_state.note_write(current_user_id.get())
+
+
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
 )
 Base = declarative_base()
@@ -29,5 +302,11 @@ async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
+async def get_read_db():
+    """Session for read-only handlers; may be served by the read replica"""
+    await replica_state.refresh_lag()
+    async with AsyncSessionLocal(info={"read_only": True}) as session:
+        yield session
+
 if __name__ == '__main__':
     print(DATABASE_URL)
@@ -0,0 +1,165 @@
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Add X-DB-* headers to every response (debug / staging only)
+DB_QUERY_DEBUG_HEADERS = os.getenv("DB_QUERY_DEBUG_HEADERS", "false").lower() == "true"
+# Warn when one request runs more statements than this (0 = off)
+DB_QUERY_BUDGET = int(os.getenv("DB_QUERY_BUDGET", "15"))
+# Warn when one statement shape repeats this often in a request (likely N+1)
+DB_REPEAT_THRESHOLD = int(os.getenv("DB_REPEAT_THRESHOLD", "5"))
+
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50)
+TIME_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_PLACEHOLDERS = re.compile(r"\$\d+|%\(\w+\)s|\?|:\w+")
+_LISTS = re.compile(r"\(\s*\?(\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with parameters and IN-lists folded, so repeats compare equal"""
+    shape = _PLACEHOLDERS.sub("?", statement)
+    shape = _LISTS.sub("(?...)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+class RequestQueryStats:
+    def __init__(self):
+        self.count = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def repeated(self, threshold: int = 2) -> Dict[str, int]:
+        return {shape: n for shape, n in self.shapes.items() if n >= threshold}
+
+
+request_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Count statements and DB time against the current request's RequestQueryStats"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if request_query_stats.get() is not None:
+            context._stats_started_at = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = request_query_stats.get()
+        started = getattr(context, "_stats_started_at", None)
+        if stats is None or started is None:
+            return
+        stats.count += 1
+        stats.db_seconds += time.perf_counter() - started
+        stats.shapes[statement_shape(statement)] += 1
+
+
+def _bucket(value: float, bounds) -> str:
+    for bound in bounds:
+        if value <= bound:
+            return f"le_{bound}"
+    return f"gt_{bounds[-1]}"
+
+
+class QueryMetrics:
+    """Per-route histograms of statements per request and DB time per request"""
+
+    def __init__(self):
+        self.routes: Dict[str, dict] = {}
+
+    def observe(self, route: str, stats: RequestQueryStats) -> None:
+        entry = self.routes.get(route)
+        if entry is None:
+            entry = self.routes[route] = {
+                "requests": 0,
+                "queries": 0,
+                "db_ms": 0.0,
+                "max_queries": 0,
+                "over_budget": 0,
+                "query_count_histogram": Counter(),
+                "db_ms_histogram": Counter(),
+            }
+        db_ms = stats.db_seconds * 1000
+        entry["requests"] += 1
+        entry["queries"] += stats.count
+        entry["db_ms"] += db_ms
+        entry["max_queries"] = max(entry["max_queries"], stats.count)
+        if DB_QUERY_BUDGET and stats.count > DB_QUERY_BUDGET:
+            entry["over_budget"] += 1
+        entry["query_count_histogram"][_bucket(stats.count, COUNT_BUCKETS)] += 1
+        entry["db_ms_histogram"][_bucket(db_ms, TIME_BUCKETS_MS) + "ms"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "query_budget": DB_QUERY_BUDGET,
+            "routes": {
+                route: {
+                    **{key: value for key, value in entry.items() if not key.endswith("histogram")},
+                    "avg_queries": round(entry["queries"] / entry["requests"], 2),
+                    "avg_db_ms": round(entry["db_ms"] / entry["requests"], 2),
+                    "db_ms": round(entry["db_ms"], 2),
+                    "query_count_histogram": dict(entry["query_count_histogram"]),
+                    "db_ms_histogram": dict(entry["db_ms_histogram"]),
+                }
+                for route, entry in self.routes.items()
+            },
+        }
+
+
+query_metrics = QueryMetrics()
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware that gives each HTTP request its own RequestQueryStats, records
+    it in query_metrics, warns about budget overruns / repeated statements and,
+    with DB_QUERY_DEBUG_HEADERS, reports the numbers in response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = request_query_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and DB_QUERY_DEBUG_HEADERS:
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-db-query-count", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{stats.db_seconds * 1000:.1f}".encode()),
+                    (b"x-db-repeated-statements", str(len(stats.repeated())).encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            # recorded at the very end so statements in dependency teardown still count
+            route = scope.get("route")
+            name = f"{scope['method']} {getattr(route, 'path', 'unmatched')}"
+            query_metrics.observe(name, stats)
+            self._warn(name, stats)
+            request_query_stats.reset(token)
+
+    @staticmethod
+    def _warn(name: str, stats: RequestQueryStats) -> None:
+        if DB_QUERY_BUDGET and stats.count > DB_QUERY_BUDGET:
+            print(f"Query budget exceeded: {name} ran {stats.count} statements (budget {DB_QUERY_BUDGET}, "
+                  f"{stats.db_seconds * 1000:.1f}ms in DB)")
+        for shape, n in stats.repeated(DB_REPEAT_THRESHOLD).items():
+            print(f"Possible N+1 in {name}: {n}x {shape[:200]}")
@@ -0,0 +1,117 @@
+import hashlib
+import hmac
+import os
+import time
+from contextvars import ContextVar
+from http.cookies import CookieError, SimpleCookie
+from typing import Optional
+from uuid import UUID
+
+# After a user's own write, their reads go to the primary for this long
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "15"))
+READ_YOUR_WRITES_COOKIE = os.getenv("READ_YOUR_WRITES_COOKIE", "cn_last_write")
+LAST_WRITE_HEADER = "x-last-write"
+# Signed with the JWT key so clients cannot mint markers for other users or far-future times
+_SECRET = os.getenv("JWT_SECRET_KEY", "fallback-secret-key").encode()
+# Clock difference tolerated between the instance that wrote and the one reading
+_CLOCK_SKEW_SECONDS = 5
+
+
+class LastWrite:
+    """
+    A request's last-write marker: the one the client sent back (if valid), replaced
+    when the request itself commits a write so the response can hand out a new one.
+    """
+
+    def __init__(self, user_id: Optional[UUID] = None, written_at: Optional[float] = None):
+        self.user_id = user_id
+        self.written_at = written_at
+        self.changed = False
+
+    def record(self, user_id: UUID) -> None:
+        self.user_id = user_id
+        self.written_at = time.time()
+        self.changed = True
+
+    def covers(self, user_id: Optional[UUID]) -> bool:
+        if user_id is None or self.user_id != user_id or self.written_at is None:
+            return False
+        age = time.time() - self.written_at
+        return -_CLOCK_SKEW_SECONDS <= age < READ_YOUR_WRITES_SECONDS
+
+
+request_last_write: ContextVar[Optional[LastWrite]] = ContextVar("request_last_write", default=None)
+
+
+def _signature(payload: str) -> str:
+    return hmac.new(_SECRET, payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def encode_last_write(user_id: UUID, written_at: float) -> str:
+    payload = f"{user_id}.{int(written_at * 1000)}"
+    return f"{payload}.{_signature(payload)}"
+
+
+def decode_last_write(value: str) -> Optional[LastWrite]:
+    """LastWrite from a marker, or None when it is malformed or its signature does not match"""
+    try:
+        user_id, written_ms, signature = value.strip().split(".")
+        if not hmac.compare_digest(signature, _signature(f"{user_id}.{written_ms}")):
+            return None
+        return LastWrite(UUID(user_id), int(written_ms) / 1000)
+    except ValueError:
+        return None
+
+
+def _marker_from_scope(scope) -> Optional[LastWrite]:
+    cookie_header = None
+    for name, value in scope.get("headers", []):
+        if name == LAST_WRITE_HEADER.encode():
+            return decode_last_write(value.decode("latin-1"))
+        if name == b"cookie":
+            cookie_header = value.decode("latin-1")
+    if cookie_header:
+        try:
+            morsel = SimpleCookie(cookie_header).get(READ_YOUR_WRITES_COOKIE)
+        except CookieError:
+            return None
+        if morsel is not None:
+            return decode_last_write(morsel.value)
+    return None
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware that carries the last-write time between instances. A response to
+    a request that committed a write gets a signed marker in the X-Last-Write header and
+    a cookie; a request that sends either back keeps that user's get_read_db sessions on
+    the primary for READ_YOUR_WRITES_SECONDS, whichever instance serves it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        marker = _marker_from_scope(scope) or LastWrite()
+        token = request_last_write.set(marker)
+
+        async def send_with_marker(message):
+            if message["type"] == "http.response.start" and marker.changed:
+                value = encode_last_write(marker.user_id, marker.written_at)
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={value}; Max-Age={int(READ_YOUR_WRITES_SECONDS) + 1}; "
+                    "Path=/; HttpOnly; Secure; SameSite=None"
+                )
+                headers = list(message.get("headers", []))
+                headers += [(LAST_WRITE_HEADER.encode(), value.encode()), (b"set-cookie", cookie.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_marker)
+        finally:
+            request_last_write.reset(token)
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import text
 
-from database.database import get_db
+from database.database import get_db, engine, replica_engine, replica_state, pool_metrics
+from database.instrumentation import query_metrics
+from api.user.auth import get_token_principal
+from api.user.principal_cache import UserPrincipal
+from api.user.enum import RoleEnum
 
 router = APIRouter(prefix="/db_query", tags=["database"])
 
@@ -27,3 +31,27 @@ async def get_table_names(db: AsyncSession = Depends(get_db)):
 async def ping_db(db: AsyncSession = Depends(get_db)):
     result = await db.execute(text("SELECT 1"))
     return {"result": result.scalar_one()}
+
+@router.get("/pool-metrics")
+async def get_pool_metrics(current_user: UserPrincipal = Depends(get_token_principal)):
+    """
+    Connection pool occupancy and checkout wait-time metrics for this process,
+    plus read-replica health (admins/owners only).
+    """
+    if current_user.role not in [RoleEnum.admin.value, RoleEnum.owner.value]:
+        raise HTTPException(status_code=403, detail="Not authorized to view pool metrics")
+    return {
+        "primary": pool_metrics(engine),
+        "replica": pool_metrics(replica_engine) if replica_engine is not None else None,
+        "replica_state": replica_state.snapshot(),
+    }
+
+@router.get("/query-metrics")
+async def get_query_metrics(current_user: UserPrincipal = Depends(get_token_principal)):
+    """
+    Per-route histograms of SQL statements and DB time per request for this process
+    (admins/owners only).
+    """
+    if current_user.role not in [RoleEnum.admin.value, RoleEnum.owner.value]:
+        raise HTTPException(status_code=403, detail="Not authorized to view query metrics")
+    return query_metrics.snapshot()
@@ -1,11 +1,51 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.router import api_router
+from api.http_client import start_http_client, close_http_client
+from api.cloudflare.r2_service import r2_client
+from api.user.auth import tune_password_hashing
+from api.user.password_pool import password_pool
+from api.mail.worker import email_worker, EMAIL_WORKER_ENABLED
+from api.post.counters import counter_flusher, deferred_counters
+from api.stored_media.sweeper import upload_sweeper, UPLOAD_SWEEP_ENABLED
+from api.timeline.fanout import timeline_fanout_worker, TIMELINE_FANOUT_WORKER_ENABLED
+from database.database import engine, replica_engine
+from database.instrumentation import QueryStatsMiddleware
+from database.read_your_writes import ReadYourWritesMiddleware
 from media.static_files import mount_static_files
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import uvicorn
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    start_http_client()
+    await tune_password_hashing()
+    if EMAIL_WORKER_ENABLED:
+        email_worker.start()
+    if deferred_counters():
+        counter_flusher.start()
+    if UPLOAD_SWEEP_ENABLED:
+        upload_sweeper.start()
+    if TIMELINE_FANOUT_WORKER_ENABLED:
+        timeline_fanout_worker.start()
+    yield
+    # Shutdown
+    await email_worker.stop()
+    await counter_flusher.stop()
+    await upload_sweeper.stop()
+    await timeline_fanout_worker.stop()
+    await close_http_client()
+    r2_client.close()
+    password_pool.close()
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5173", # frontend
@@ -16,12 +56,16 @@ FRONTEND_URL = os.getenv("FRONTEND_URL")
 if FRONTEND_URL:
     origins.append(FRONTEND_URL)
 
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Last-Write"],
 )
 
 @app.get("/")
@@ -0,0 +1,113 @@
+"""
+Login storm benchmark: does password hashing still block the event loop?
+
+Measures GET / latency at rest. Then fires --logins concurrent POST /api/users/login
+calls while a probe keeps hitting GET / and prints p50/p99 for both. With
+hashing off the event loop, the probe's p99 under load should stay close to its
+baseline, while the login latencies grow with the hash pool's queue. Logins
+rejected with 503 (PASSWORD_HASH_MAX_QUEUE) are counted separately.
+
+Run against a running API with an existing account:
+
+    python scripts/bench_login.py --base-url http://localhost:8000 \\
+        --email bench@example.com --password secret --logins 200 --concurrency 50
+
+API routes are mounted under --api-prefix (main.py uses /api); the GET / probe is not.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import List, Tuple
+
+import httpx
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label: str, samples: List[float]) -> None:
+    if not samples:
+        print(f"{label:<22} no samples")
+        return
+    print(
+        f"{label:<22} n={len(samples):<5} p50={percentile(samples, 50):7.1f}ms "
+        f"p99={percentile(samples, 99):7.1f}ms max={max(samples):7.1f}ms mean={statistics.fmean(samples):7.1f}ms"
+    )
+
+
+async def timed(call) -> Tuple[float, int]:
+    started = time.perf_counter()
+    response = await call
+    return (time.perf_counter() - started) * 1000, response.status_code
+
+
+async def probe(client: httpx.AsyncClient, interval: float, stop: asyncio.Event, samples: List[float]) -> None:
+    while not stop.is_set():
+        elapsed, _status = await timed(client.get("/"))
+        samples.append(elapsed)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main(args) -> int:
+    limits = httpx.Limits(max_connections=args.concurrency + 5, max_keepalive_connections=args.concurrency + 5)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        baseline: List[float] = []
+        for _ in range(args.baseline):
+            baseline.append((await timed(client.get("/")))[0])
+
+        limit = asyncio.Semaphore(args.concurrency)
+        login_ms: List[float] = []
+        statuses: Counter = Counter()
+        credentials = {"email": args.email, "password": args.password}
+        login_path = f"{args.api_prefix.rstrip('/')}/users/login"
+
+        async def login() -> None:
+            async with limit:
+                try:
+                    elapsed, status = await timed(client.post(login_path, json=credentials))
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                    return
+                statuses[status] += 1
+                if status == 200:
+                    login_ms.append(elapsed)
+
+        stop = asyncio.Event()
+        under_load: List[float] = []
+        prober = asyncio.create_task(probe(client, args.probe_interval, stop, under_load))
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(args.logins)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await prober
+
+    print(f"{args.logins} logins, concurrency {args.concurrency}, {wall:.2f}s wall ({args.logins / wall:.1f}/s)")
+    print(f"statuses: {dict(statuses)}")
+    report("GET / baseline", baseline)
+    report("GET / during logins", under_load)
+    report(f"POST {args.api_prefix.rstrip('/')}/users/login", login_ms)
+    return 0 if statuses.get(200) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent /api/users/login load with a GET / latency probe")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--api-prefix", default="/api", help="prefix the API routers are mounted under")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--baseline", type=int, default=50, help="GET / samples taken before the load")
+    parser.add_argument("--probe-interval", type=float, default=0.02, help="seconds between probe requests")
+    parser.add_argument("--timeout", type=float, default=30)
+    sys.exit(asyncio.run(main(parser.parse_args())))
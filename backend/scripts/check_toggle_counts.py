@@ -0,0 +1,123 @@
+"""
+Concurrency check for like/save toggles against a real Postgres database.
+
+Creates a throwaway post and users, fires many concurrent toggles at the post
+(each in its own session and transaction, several per user so toggles of the
+same (user, post) pair race each other), then asserts that posts.likes_count
+and posts.saves_count equal count(*) of the likes and saves rows. Everything it
+created is deleted afterwards. Exits 1 when a counter is off.
+
+Run from backend/ with DATABASE_URL set (a scratch database, migrated to head):
+
+    python scripts/check_toggle_counts.py --users 50 --toggles 8 --concurrency 12
+
+Works in both ENGAGEMENT_COUNTER_MODE=direct and deferred (pending deltas are
+flushed before comparing).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, delete, func
+
+import api  # noqa: F401  (registers every model with the mapper)
+from api.post.counters import deferred_counters, counter_flusher
+from api.post.engagement import toggle_engagement
+from api.post.models import Post, Like, Save, PostCounterDelta
+from api.user.models import User
+from database.database import AsyncSessionLocal, engine
+
+
+async def create_fixtures(users: int):
+    run = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        people = [
+            User(username=f"toggle_{run}_{i}", email=f"toggle_{run}_{i}@example.invalid", hashed_password="!")
+            for i in range(users)
+        ]
+        db.add_all(people)
+        await db.flush()
+        post = Post(content=f"toggle check {run}", author_id=people[0].id)
+        db.add(post)
+        await db.commit()
+        return post.id, [u.id for u in people]
+
+
+async def toggle(kind: str, post_id, user_id, limit: asyncio.Semaphore, errors: list) -> None:
+    async with limit:
+        async with AsyncSessionLocal() as db:
+            try:
+                await toggle_engagement(db, kind, post_id, user_id)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                errors.append(f"{kind} by {user_id}: {e}")
+
+
+async def check_counts(post_id) -> bool:
+    if deferred_counters():
+        await counter_flusher.flush_all()
+    async with AsyncSessionLocal() as db:
+        post = (await db.execute(select(Post).where(Post.id == post_id))).scalars().one()
+        likes = (await db.execute(select(func.count()).select_from(Like).where(Like.post_id == post_id))).scalar()
+        saves = (await db.execute(select(func.count()).select_from(Save).where(Save.post_id == post_id))).scalar()
+    print(f"likes_count={post.likes_count} likes={likes}  saves_count={post.saves_count} saves={saves}")
+    return post.likes_count == likes and post.saves_count == saves
+
+
+async def cleanup(post_id, user_ids) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Like).where(Like.post_id == post_id))
+        await db.execute(delete(Save).where(Save.post_id == post_id))
+        await db.execute(delete(PostCounterDelta).where(PostCounterDelta.post_id == post_id))
+        await db.execute(delete(Post).where(Post.id == post_id))
+        await db.execute(delete(User).where(User.id.in_(user_ids)))
+        await db.commit()
+
+
+async def main(args) -> int:
+    random.seed(args.seed)
+    post_id, user_ids = await create_fixtures(args.users)
+    try:
+        limit = asyncio.Semaphore(args.concurrency)
+        errors: list = []
+        jobs = [
+            (kind, user_id)
+            for user_id in user_ids
+            for kind in ("like", "save")
+            for _ in range(random.randint(1, args.toggles))
+        ]
+        random.shuffle(jobs)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(toggle(kind, post_id, user_id, limit, errors) for kind, user_id in jobs))
+        elapsed = time.perf_counter() - started
+        mode = "deferred" if deferred_counters() else "direct"
+        print(f"{len(jobs)} toggles ({mode} counters, concurrency {args.concurrency}) in {elapsed:.2f}s")
+
+        for error in errors[:10]:
+            print(f"toggle failed: {error}")
+        ok = await check_counts(post_id) and not errors
+        print("OK" if ok else "MISMATCH")
+        return 0 if ok else 1
+    finally:
+        if not args.keep:
+            await cleanup(post_id, user_ids)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fire concurrent like/save toggles and verify the post counters")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--toggles", type=int, default=8, help="max toggles per user and kind (random 1..N)")
+    # keep at or below DB_POOL_SIZE + DB_MAX_OVERFLOW so sessions don't time out waiting for a connection
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--keep", action="store_true", help="leave the post, users and rows in place")
+    sys.exit(asyncio.run(main(parser.parse_args())))
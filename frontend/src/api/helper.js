@@ -9,6 +9,10 @@ const api = axios.create({
   baseURL: API_URL,
 });
 
+// Signed marker from the last response that committed a write; sent back so the
+// reads right after a write skip the read replica, whichever API instance serves them
+let lastWrite = null;
+
 // Function to set auth token in headers
 export const setAuthToken = (token) => {
   if (token) {
@@ -29,6 +33,7 @@ export const hasValidTokens = () => {
 const clearTokens = () => {
   localStorage.removeItem('access_token');
   localStorage.removeItem('refresh_token');
+  lastWrite = null;
   setAuthToken(null);
 };
 
@@ -69,12 +74,21 @@ api.interceptors.request.use((config) => {
   if (token) {
     config.headers['Authorization'] = `Bearer ${token}`;
   }
+  if (lastWrite) {
+    config.headers['X-Last-Write'] = lastWrite;
+  }
   return config;
 });
 
 // Add interceptor to handle token expiration and refresh
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const marker = response.headers['x-last-write'];
+    if (marker) {
+      lastWrite = marker;
+    }
+    return response;
+  },
   async (error) => {
     const originalRequest = error.config;
 